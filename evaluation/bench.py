@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+from main import load_data
+from utils.charts import plan_render_jobs
+from utils.compositions import REGISTRIES
+from utils.preprocessing import load_chain_stores, load_measurements
+from utils.rendering import job_output_filename
+from utils.synthetic import generate_dataset
+
+BENCH_SIZES = [1_000, 10_000, 100_000]
+RESULTS_FILE = "bench-results.json"
+
+
+def _max_rss_bytes():
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+@contextmanager
+def measure(results, stage, **fields):
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    yield
+    results.append(
+        {
+            "stage": stage,
+            **fields,
+            "wall_s": time.perf_counter() - start_wall,
+            "cpu_s": time.process_time() - start_cpu,
+            "peak_bytes": (
+                tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+            ),
+            "max_rss_bytes": _max_rss_bytes(),
+        }
+    )
+
+
+def bench_size(n_runs, work_path, render=True, seed=0):
+    # times every stage of main() on n_runs synthetic runs per data file
+    results = []
+    data_path = os.path.join(work_path, "data")
+
+    with measure(results, "generate", runs=n_runs):
+        generate_dataset(data_path, n_runs, seed=seed)
+
+    with measure(results, "load_arweave", runs=n_runs):
+        load_measurements(os.path.join(data_path, "Arweave.json"), use_cache=False)
+
+    for registry in REGISTRIES:
+        with measure(results, f"load_registry:{registry}", runs=n_runs):
+            load_chain_stores(
+                os.path.join(data_path, "contracts", f"{registry}.json"),
+                use_cache=False,
+            )
+
+    with measure(results, "load_data:cold_cache", runs=n_runs):
+        load_data(data_path)
+
+    with measure(results, "load_data:warm_cache", runs=n_runs):
+        arweave_data, registry_stores = load_data(data_path)
+
+    with measure(results, "plan_render_jobs", runs=n_runs):
+        jobs = plan_render_jobs(arweave_data, registry_stores)
+
+    if render:
+        # plot functions write relative to the working directory
+        cwd = os.getcwd()
+        os.makedirs(os.path.join(work_path, "plots"), exist_ok=True)
+        os.chdir(work_path)
+        try:
+            for job in jobs:
+                with measure(
+                    results, f"render:{job_output_filename(job)}", runs=n_runs
+                ):
+                    job.plot_function(**job.kwargs)
+        finally:
+            os.chdir(cwd)
+
+    return results
+
+
+def machine_info():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def print_results(results):
+    print(f"{'runs':>10}  {'stage':<60} {'wall s':>9} {'cpu s':>9} {'peak MiB':>9}")
+    for row in results:
+        peak = row["peak_bytes"] / 2**20 if row["peak_bytes"] is not None else np.nan
+        print(
+            f"{row['runs']:>10}  {row['stage']:<60} "
+            f"{row['wall_s']:>9.3f} {row['cpu_s']:>9.3f} {peak:>9.1f}"
+        )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the evaluation pipeline on synthetic data."
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        nargs="+",
+        default=BENCH_SIZES,
+        help="runs per generated data file, one benchmark per size "
+        f"(default: {' '.join(str(size) for size in BENCH_SIZES)})",
+    )
+    parser.add_argument(
+        "--output",
+        default=RESULTS_FILE,
+        help=f"file the results are written to as JSON (default: {RESULTS_FILE})",
+    )
+    parser.add_argument(
+        "--work-dir",
+        help="directory for the generated data and plots, "
+        "a temporary directory that is removed afterwards by default",
+    )
+    parser.add_argument(
+        "--no-render",
+        action="store_true",
+        help="only benchmark loading and preprocessing",
+    )
+    parser.add_argument(
+        "--no-tracemalloc",
+        action="store_true",
+        help="do not trace allocations; faster, but no peak memory per stage",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="seed of the synthetic data generators (default: 0)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    work_path = args.work_dir or tempfile.mkdtemp(prefix="permapass-bench-")
+    if not args.no_tracemalloc:
+        tracemalloc.start()
+
+    results = []
+    try:
+        for n_runs in args.runs:
+            size_path = os.path.join(work_path, str(n_runs))
+            results.extend(
+                bench_size(n_runs, size_path, render=not args.no_render, seed=args.seed)
+            )
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_path, ignore_errors=True)
+
+    print_results(results)
+
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "machine": machine_info(),
+                "tracemalloc": not args.no_tracemalloc,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+
+
+if __name__ == "__main__":
+    main()
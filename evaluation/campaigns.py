@@ -0,0 +1,83 @@
+import argparse
+import time
+
+import pandas as pd
+from utils.results import (
+    RESULT_METRICS,
+    RESULTS_DB,
+    campaigns,
+    compare_campaigns,
+    connect,
+    trend,
+)
+
+
+def argument_parser():
+    parser = argparse.ArgumentParser(
+        description="Query the statistics recorded with main.py --campaign."
+    )
+    parser.add_argument(
+        "--results-db",
+        default=RESULTS_DB,
+        metavar="FILE",
+        help=f"SQLite results database (default: {RESULTS_DB})",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="list the recorded campaigns, oldest first")
+
+    compare = commands.add_parser("compare", help="compare the means of two campaigns")
+    compare.add_argument("baseline", help="campaign to compare against")
+    compare.add_argument("candidate", help="campaign to compare")
+    compare.add_argument("--metric", choices=RESULT_METRICS)
+
+    trend_parser = commands.add_parser(
+        "trend", help="statistics of one registry and action in every campaign"
+    )
+    trend_parser.add_argument("registry", help="e.g. PBTRegistry or Arweave")
+    trend_parser.add_argument("action", help="e.g. create")
+    trend_parser.add_argument("--metric", choices=RESULT_METRICS, default="duration")
+    trend_parser.add_argument(
+        "--function", default="", help="function name, whole runs if omitted"
+    )
+    trend_parser.add_argument("--chain", help="chain id, all chains if omitted")
+    return parser
+
+
+def main():
+    parser = argument_parser()
+    args = parser.parse_args()
+    connection = connect(args.results_db)
+    try:
+        if args.command == "list":
+            rows = campaigns(connection)
+        elif args.command == "compare":
+            rows = compare_campaigns(
+                connection, args.baseline, args.candidate, args.metric
+            )
+        else:
+            rows = trend(
+                connection,
+                args.registry,
+                args.action,
+                args.metric,
+                args.function,
+                args.chain,
+            )
+    except ValueError as error:
+        # unknown campaigns, the message lists the recorded ones
+        parser.error(str(error))
+    finally:
+        connection.close()
+
+    frame = pd.DataFrame(rows)
+    if "recorded_at" in frame:
+        frame["recorded_at"] = [
+            time.strftime("%Y-%m-%d %H:%M", time.localtime(recorded_at))
+            for recorded_at in frame["recorded_at"]
+        ]
+    print(frame.to_string(index=False) if len(frame) else "No results.")
+
+
+if __name__ == "__main__":
+    main()
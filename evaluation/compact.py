@@ -0,0 +1,22 @@
+import argparse
+
+from utils.measurement_log import convert
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Convert measurements between the JSON layout of data/ and "
+        "append-only JSON Lines logs (one run per line)."
+    )
+    parser.add_argument("source", help="file to read, .json or .jsonl")
+    parser.add_argument("target", help="file to write, the other format")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    convert(args.source, args.target)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import argparse
+import os
+import sys
+
+import pandas as pd
+from utils.compositions import REGISTRIES
+from utils.export import TABLE_FORMATS, check_table_format, write_table
+from utils.preprocessing import SEPOLIA_CHAIN_ID, data_file, load_registry_store
+from utils.regression import ALPHA, GATE_METRICS, regression_rows
+
+
+def argument_parser():
+    parser = argparse.ArgumentParser(
+        description="Compare two measurement sets in the data/contracts layout "
+        "and exit with status 1 if the candidate regressed."
+    )
+    parser.add_argument(
+        "baseline", help="directory with the <Registry>.json files, or one file"
+    )
+    parser.add_argument("candidate", help="the same for the measurements to check")
+    parser.add_argument(
+        "--chain",
+        default=SEPOLIA_CHAIN_ID,
+        help=f"chain id of the compared runs (default: {SEPOLIA_CHAIN_ID})",
+    )
+    parser.add_argument(
+        "--max-gas-increase",
+        type=float,
+        default=GATE_METRICS["gasUsed"]["max_increase"],
+        metavar="PERCENT",
+        help="largest accepted increase of the median gasUsed (default: "
+        f'{GATE_METRICS["gasUsed"]["max_increase"]})',
+    )
+    parser.add_argument(
+        "--max-latency-increase",
+        type=float,
+        default=GATE_METRICS["durationInMs"]["max_increase"],
+        metavar="PERCENT",
+        help="largest accepted increase of the p95 duration (default: "
+        f'{GATE_METRICS["durationInMs"]["max_increase"]})',
+    )
+    parser.add_argument(
+        "--alpha",
+        type=float,
+        default=ALPHA,
+        help=f"significance level of the tests (default: {ALPHA})",
+    )
+    parser.add_argument(
+        "--output",
+        metavar="FILE",
+        help="also write every comparison to FILE, "
+        f"as {', '.join(TABLE_FORMATS)} by its extension",
+    )
+    return parser
+
+
+def parse_args(parser):
+    args = parser.parse_args()
+
+    if args.output:
+        try:
+            check_table_format(output_format(args.output))
+        except ValueError as error:
+            parser.error(str(error))
+    return args
+
+
+def output_format(file_path):
+    return os.path.splitext(file_path)[1].lstrip(".")
+
+
+def measurement_files(path):
+    # registry -> measurement file of a directory like data/contracts, or of
+    # one file named after its registry
+    if os.path.isfile(path):
+        registry = os.path.basename(path).split(".")[0]
+        if registry not in REGISTRIES:
+            raise ValueError(
+                f"Invalid registry file. Choose one of {', '.join(REGISTRIES)}."
+            )
+        return {registry: path}
+    files = {
+        registry: data_file(os.path.join(path, registry)) for registry in REGISTRIES
+    }
+    return {
+        registry: file_path
+        for registry, file_path in files.items()
+        if os.path.exists(file_path)
+    }
+
+
+def load_stores(path, chain_id):
+    # without the .npy cache, so nothing is written next to the inputs
+    return {
+        registry: load_registry_store(file_path, use_cache=False, chain_id=chain_id)
+        for registry, file_path in measurement_files(path).items()
+    }
+
+
+def main():
+    parser = argument_parser()
+    args = parse_args(parser)
+    metrics = {
+        "gasUsed": {**GATE_METRICS["gasUsed"], "max_increase": args.max_gas_increase},
+        "durationInMs": {
+            **GATE_METRICS["durationInMs"],
+            "max_increase": args.max_latency_increase,
+        },
+    }
+
+    # invalid inputs exit with status 2 like invalid options, status 1 is
+    # reserved for regressions
+    try:
+        rows = regression_rows(
+            load_stores(args.baseline, args.chain),
+            load_stores(args.candidate, args.chain),
+            metrics,
+            args.alpha,
+        )
+        if not rows:
+            raise ValueError("The measurement sets have no registry runs in common.")
+    except ValueError as error:
+        parser.error(str(error))
+
+    if args.output:
+        write_table(rows, args.output, output_format(args.output))
+
+    frame = pd.DataFrame(rows)
+    regressions = frame[frame["regression"]].drop(columns="regression")
+    if len(regressions):
+        print(regressions.to_string(index=False))
+    print(f"{len(regressions)} of {len(frame)} comparisons regressed")
+    sys.exit(1 if len(regressions) else 0)
+
+
+if __name__ == "__main__":
+    main()
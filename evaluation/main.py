@@ -1,239 +1,351 @@
-from utils.gas_costs import (
-    plot_contracts_gas_costs,
-    plot_gas_costs,
-    plot_passport_types_gas_costs,
-    plot_passport_types_operation_gas_costs,
-)
-from utils.performance import (
-    plot_contracts_performance,
-    plot_passport_types_operation_performance,
-    plot_passport_types_performance,
-    plot_performance,
+import argparse
+import os
+import time
+
+from utils.compositions import ARWEAVE, REGISTRIES
+from utils.export import (
+    TABLE_FORMATS,
+    TABLES_PATH,
+    check_table_format,
+    compute_tables,
+    write_tables,
 )
-from utils.preprocessing import (
-    load_json,
-    process_passport_type_gas_costs_data,
-    process_passport_type_performance_data,
-    process_registry_data,
+from utils.fees import SCENARIO_ETH_TO_USD, SCENARIO_GAS_PRICES_IN_GWEI
+from utils.outliers import OUTLIER_METHODS
+from utils.preprocessing import data_file, load_chain_stores, load_measurements
+from utils.prices import (
+    load_price_history,
+    price_history_file,
+    price_history_files,
+    price_stores,
 )
-from utils.summary import plot_summary
+from utils.profiling import PROFILE_FILE, enable, enable_from_environment, profiled
+from utils.results import RESULTS_DB, connect, record_campaign
+from utils.timeseries import SERIES_STATISTICS, check_series
+from utils.watch import WATCH_INTERVAL, watch_files
 
 
-def plot_arweave(arweave_data):
-    plot_performance(
-        data_list=[
-            arweave_data["create"],
-            arweave_data["read"],
-            arweave_data["update"],
-        ],
-        labels=["Create", "Read", "Update"],
-        title="Performance of Arweave Interactions using Irys Node 2",
-        output_filename="performance_arweave.png",
-        x_axis="s",
-        is_arweave=True,
+def parse_args():
+    parser = argparse.ArgumentParser(description="Render the evaluation plots.")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes used to render the plots (default: 1)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="re-render all plots, even if their inputs did not change",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=PROFILE_FILE,
+        metavar="FILE",
+        help="record the time and memory of every stage and write them to FILE "
+        f"at exit (default: {PROFILE_FILE}); a .folded FILE gives folded stacks "
+        "for flamegraph.pl, also enabled by the PERMAPASS_PROFILE variable",
+    )
+    parser.add_argument(
+        "--data-only",
+        action="store_true",
+        help=f"write the tables behind the plots to {TABLES_PATH}/ instead of "
+        "rendering, without loading the plotting libraries",
+    )
+    parser.add_argument(
+        "--data-format",
+        choices=TABLE_FORMATS,
+        default="csv",
+        help="file format of the --data-only tables (default: csv)",
+    )
+    parser.add_argument(
+        "--gas-prices",
+        type=float,
+        nargs="+",
+        default=SCENARIO_GAS_PRICES_IN_GWEI,
+        metavar="GWEI",
+        help="gas prices of the fee projections table of --data-only, each "
+        "combined with every --eth-usd rate (default: "
+        f"{' '.join(map(str, SCENARIO_GAS_PRICES_IN_GWEI))})",
+    )
+    parser.add_argument(
+        "--eth-usd",
+        type=float,
+        nargs="+",
+        default=SCENARIO_ETH_TO_USD,
+        metavar="USD",
+        help="ETH/USD rates of the fee projections table of --data-only "
+        f"(default: {' '.join(map(str, SCENARIO_ETH_TO_USD))})",
+    )
+    parser.add_argument(
+        "--report",
+        action="store_true",
+        help="write all charts into one self-contained, interactive HTML file, "
+        "plots/report.html, instead of rendering the PNGs",
+    )
+    parser.add_argument(
+        "--outliers",
+        choices=OUTLIER_METHODS,
+        help="classify outliers per registry and action with this method; line "
+        "charts mark them and show trimmed means next to the means, tables get "
+        "trimmed statistics and the flagged runs",
+    )
+    series = parser.add_mutually_exclusive_group()
+    series.add_argument(
+        "--resample",
+        metavar="INTERVAL",
+        help="draw the line charts as one point per INTERVAL, e.g. 5min, "
+        "instead of one per run",
+    )
+    series.add_argument(
+        "--rolling",
+        metavar="WINDOW",
+        help="draw the line charts as a rolling statistic over the runs of the "
+        "last WINDOW, e.g. 15min",
+    )
+    parser.add_argument(
+        "--series-statistic",
+        default="mean",
+        metavar="STATISTIC",
+        help="statistic of --resample and --rolling: "
+        f"{', '.join(SERIES_STATISTICS)} or a percentile like p95 (default: mean)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and update the outputs whenever a measurement file "
+        "in data/ changes",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=WATCH_INTERVAL,
+        help=f"seconds between checks for changes (default: {WATCH_INTERVAL})",
+    )
+    parser.add_argument(
+        "--campaign",
+        metavar="NAME",
+        help="also record the statistics of the tables under this campaign name "
+        "in the results database, replacing an earlier recording of the same "
+        "name; compare campaigns with campaigns.py",
     )
+    parser.add_argument(
+        "--results-db",
+        default=RESULTS_DB,
+        metavar="FILE",
+        help=f"SQLite results database of --campaign (default: {RESULTS_DB})",
+    )
+    args = parser.parse_args()
 
+    # a missing Parquet engine fails here rather than after loading the data
+    price_file = price_history_file()
+    try:
+        if args.data_only:
+            check_table_format(args.data_format)
+        if price_file:
+            check_table_format(os.path.splitext(price_file)[1].lstrip("."))
+        check_series(args.resample, args.rolling, args.series_statistic)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.series_statistic != "mean" and not (args.resample or args.rolling):
+        parser.error("--series-statistic needs --resample or --rolling")
+    return args
 
-def plot_halo_nfc_metadata_registry(halo_nfc_metadata_registry_data):
-    labels = {
-        "deployment": "Deployment",
-        "create": "Create",
-        "read": "Read",
-    }
 
-    title = "HaloNFCMetadataRegistry.sol"
-    output_filename_suffix = "halo_nfc_metadata_registry"
-
-    plot_performance(
-        data_list=[
-            halo_nfc_metadata_registry_data[key]
-            for key in halo_nfc_metadata_registry_data.keys()
-        ],
-        labels=labels.values(),
-        title=f"Performance of {title}",
-        output_filename=f"performance_{output_filename_suffix}.png",
-        x_axis="s",
-    )
-    plot_gas_costs(
-        data_list=[
-            halo_nfc_metadata_registry_data[key]
-            for key in halo_nfc_metadata_registry_data.keys()
-        ],
-        labels=labels.values(),
-        title=f"Gas Costs of {title}",
-        output_filename=f"gas_costs_{output_filename_suffix}.png",
-    )
-
-
-def plot_digital_identifier_contracts(
-    did_registry_data, nft_registry_data, pbt_registry_data
-):
-    labels = {
-        "deployment": "Deployment",
-        "create": "Creation",
-        "read": "Reading",
-        "update": "Update",
-        "delete": "Deletion",
+def series_options(args):
+    # keyword arguments of prepare_series for the line charts; none without
+    # --resample or --rolling, so the charts show every run
+    if not args.resample and not args.rolling:
+        return None
+    return {
+        "interval": args.resample,
+        "rolling_window": args.rolling,
+        "statistic": args.series_statistic,
     }
 
-    registry_configs = [
-        {
-            "title": "DIDRegistry.sol",
-            "output_filename_suffix": "did_registry",
-            "data": did_registry_data,
-        },
-        {
-            "title": "NFTRegistry.sol",
-            "output_filename_suffix": "nft_registry",
-            "data": nft_registry_data,
-        },
-        {
-            "title": "PBTRegistry.sol",
-            "output_filename_suffix": "pbt_registry",
-            "data": pbt_registry_data,
-        },
-    ]
-
-    # plot_contracts_performance(registry_configs)
-    # plot_contracts_gas_costs(registry_configs)
-
-    for config in registry_configs:
-        registry_data = config["data"]
-        plot_performance(
-            data_list=[registry_data[key] for key in registry_data.keys()],
-            labels=labels.values(),
-            title=f'Performance of {config["title"]}',
-            output_filename=f'performance_{config["output_filename_suffix"]}.png',
-            x_axis="s",
-        )
-        plot_gas_costs(
-            data_list=[registry_data[key] for key in registry_data.keys()],
-            labels=labels.values(),
-            title=f'Gas Costs of {config["title"]}',
-            output_filename=f'gas_costs_{config["output_filename_suffix"]}.png',
-        )
 
-    combined_registry_data = {
-        "deployment": {
-            config["title"]: config["data"]["deployment"] for config in registry_configs
-        },
-        "create": {
-            config["title"]: config["data"]["create"] for config in registry_configs
-        },
-        "read": {
-            config["title"]: config["data"]["read"] for config in registry_configs
-        },
-        "update": {
-            config["title"]: config["data"]["update"] for config in registry_configs
-        },
-        "delete": {
-            config["title"]: config["data"]["delete"] for config in registry_configs
+def data_files(data_path="data"):
+    # source name -> measurement file
+    return {
+        ARWEAVE: data_file(os.path.join(data_path, ARWEAVE)),
+        **{
+            registry: data_file(os.path.join(data_path, "contracts", registry))
+            for registry in REGISTRIES
         },
     }
 
-    title_mapping = {
-        "deployment": "Deployment",
-        "create": "Creation",
-        "read": "Reading",
-        "update": "Update",
-        "delete": "Deletion",
-    }
 
-    for action_type in combined_registry_data:
-        plot_performance(
-            data_list=[
-                combined_registry_data[action_type][key]
-                for key in combined_registry_data[action_type].keys()
-            ],
-            labels=combined_registry_data[action_type].keys(),
-            title=f"Performance of Passport {title_mapping[action_type]} by Registry Contracts",
-            output_filename=f"performance_contracts_{title_mapping[action_type].lower()}.png",
-            x_axis="s",
-        )
-        plot_gas_costs(
-            data_list=[
-                combined_registry_data[action_type][key]
-                for key in combined_registry_data[action_type].keys()
-            ],
-            labels=combined_registry_data[action_type].keys(),
-            title=f"Gas Costs for Passport {title_mapping[action_type]} by Registry Contracts",
-            output_filename=f"gas_costs_contracts_{title_mapping[action_type].lower()}.png",
-        )
+def load_data_file(name, file_path, use_cache=True, price_history=None):
+    # registry runs are priced in USD at the ETH/USD rate of their start
+    if name == ARWEAVE:
+        return load_measurements(file_path, use_cache=use_cache)
+    return price_stores(
+        load_chain_stores(file_path, use_cache=use_cache), price_history
+    )
 
 
-def plot_passport_types(
-    arweave_data,
-    did_registry_data,
-    halo_nfc_metadata_registry_data,
-    nft_registry_data,
-    pbt_registry_data,
-):
-    performance_data = process_passport_type_performance_data(
-        arweave_data,
-        did_registry_data,
-        halo_nfc_metadata_registry_data,
-        nft_registry_data,
-        pbt_registry_data,
-    )
-
-    for operation_data in performance_data:
-        operation = operation_data["operation"]
-        data = operation_data["data"]
-        labels = operation_data["labels"]
-
-        plot_passport_types_operation_performance(
-            data,
-            labels,
-            f"Performance of Passport {operation} by Passport Types",
-            output_filename=f"performance_passport_types_{operation.lower()}.png",
-        )
+@profiled
+def load_data(data_path="data", use_cache=True):
+    price_history = load_price_history(data_path)
+    data = {
+        name: load_data_file(name, file_path, use_cache, price_history)
+        for name, file_path in data_files(data_path).items()
+    }
+    return data[ARWEAVE], {registry: data[registry] for registry in REGISTRIES}
 
-    plot_passport_types_performance(performance_data)
 
-    gast_costs_data = process_passport_type_gas_costs_data(
-        did_registry_data,
-        halo_nfc_metadata_registry_data,
-        nft_registry_data,
-        pbt_registry_data,
+def args_tables(args, arweave_data, registry_stores):
+    return compute_tables(
+        arweave_data,
+        registry_stores,
+        args.outliers,
+        args.gas_prices,
+        args.eth_usd,
     )
 
-    for operation_data in gast_costs_data:
-        operation = operation_data["operation"]
-        data = operation_data["data"]
-        labels = operation_data["labels"]
 
-        plot_passport_types_operation_gas_costs(
-            data,
-            labels,
-            f"Gas Costs for Passport {operation} by Passport Types",
-            output_filename=f"gas_costs_passport_types_{operation.lower()}.png",
+def record_tables(args, tables):
+    connection = connect(args.results_db)
+    try:
+        record_campaign(connection, args.campaign, tables)
+    finally:
+        connection.close()
+
+
+def recording(produce, args):
+    # records the campaign after every chart or report output, so a watched
+    # campaign stays current in the results database; --data-only records the
+    # tables it writes itself
+    def produce_and_record(arweave_data, registry_stores):
+        output = produce(arweave_data, registry_stores)
+        record_tables(args, args_tables(args, arweave_data, registry_stores))
+        return output
+
+    return produce_and_record
+
+
+def output_function(args):
+    # what is produced from the loaded data: tables, the HTML report or charts;
+    # the returned function describes what it wrote
+    if args.data_only:
+
+        def produce_tables(arweave_data, registry_stores):
+            tables = args_tables(args, arweave_data, registry_stores)
+            write_tables(tables, args.data_format)
+            if args.campaign:
+                record_tables(args, tables)
+            return f"wrote {len(tables)} tables"
+
+        return produce_tables
+
+    if args.report:
+        from utils.report import REPORT_FILE, write_report
+
+        def produce_report(arweave_data, registry_stores):
+            write_report(
+                arweave_data, registry_stores, args.outliers, series_options(args)
+            )
+            return f"wrote {REPORT_FILE}"
+
+        return produce_report
+
+    # the plotting libraries are only imported when charts are rendered
+    from utils.charts import plan_render_jobs
+    from utils.rendering import run_render_jobs
+
+    def produce_charts(arweave_data, registry_stores):
+        jobs = plan_render_jobs(
+            arweave_data, registry_stores, args.outliers, series_options(args)
         )
+        rendered = run_render_jobs(jobs, n_jobs=args.jobs, use_cache=not args.no_cache)
+        # charts whose inputs did not change are skipped
+        return f"rendered {len(rendered)} of {len(jobs)} charts"
 
-    plot_passport_types_gas_costs(gast_costs_data)
+    return produce_charts
 
 
-def main():
-    arweave_data = load_json("data/Arweave.json")
-    did_registry_data = process_registry_data("data/contracts/DIDRegistry.json")
-    halo_nfc_metadata_registry_data = process_registry_data(
-        "data/contracts/HaloNFCMetadataRegistry.json"
-    )
-    nft_registry_data = process_registry_data("data/contracts/NFTRegistry.json")
-    pbt_registry_data = process_registry_data("data/contracts/PBTRegistry.json")
+def watch(args, produce, data):
+    # keeps the outputs current while measurement files or the price history
+    # change; only changed files are parsed again and, thanks to the render
+    # manifest, only charts whose inputs changed are rendered again. data:
+    # source name -> loaded data. The files are listed again on every poll, so
+    # a measurement log or price history created later is picked up.
+    price_history = load_price_history()
+    # file path -> last error, printed once until the error changes
+    errors = {}
 
-    plot_arweave(arweave_data)
-    plot_halo_nfc_metadata_registry(halo_nfc_metadata_registry_data)
-    plot_digital_identifier_contracts(
-        did_registry_data, nft_registry_data, pbt_registry_data
-    )
-    plot_passport_types(
-        arweave_data,
-        did_registry_data,
-        halo_nfc_metadata_registry_data,
-        nft_registry_data,
-        pbt_registry_data,
+    def list_files():
+        return [*data_files().values(), *price_history_files()]
+
+    def skip(file_path, error):
+        if errors.get(file_path) != str(error):
+            print(f"Skipping {file_path}: {error}")
+        errors[file_path] = str(error)
+
+    def on_change(changed):
+        nonlocal price_history
+        # files that fail to load are skipped and retried on the next poll
+        failed = []
+        # new prices apply to the runs of every registry
+        price_files = [path for path in changed if path in price_history_files()]
+        repriced = bool(price_files)
+        if repriced:
+            try:
+                price_history = load_price_history()
+            except ValueError as error:
+                for file_path in price_files:
+                    skip(file_path, error)
+                failed += price_files
+                repriced = False
+            else:
+                for file_path in price_files:
+                    errors.pop(file_path, None)
+
+        for name, file_path in data_files().items():
+            if file_path not in changed and not (repriced and name != ARWEAVE):
+                continue
+            try:
+                data[name] = load_data_file(name, file_path, True, price_history)
+            except ValueError as error:
+                skip(file_path, error)
+                failed.append(file_path)
+                continue
+            errors.pop(file_path, None)
+
+        loaded = [file_path for file_path in changed if file_path not in failed]
+        if loaded:
+            output = produce(
+                data[ARWEAVE], {registry: data[registry] for registry in REGISTRIES}
+            )
+            print(f"{time.strftime('%H:%M:%S')} {', '.join(loaded)} changed, {output}")
+        return failed
+
+    print(
+        f"Watching {len(data_files())} measurement files and the price history, "
+        "press Ctrl+C to stop"
     )
-    plot_summary()
+    try:
+        watch_files(list_files, on_change, args.watch_interval)
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    args = parse_args()
+    if args.profile:
+        enable(args.profile)
+    else:
+        enable_from_environment()
+
+    produce = output_function(args)
+    if args.campaign and not args.data_only:
+        produce = recording(produce, args)
+    arweave_data, registry_stores = load_data()
+    produce(arweave_data, registry_stores)
+
+    if args.watch:
+        watch(args, produce, {ARWEAVE: arweave_data, **registry_stores})
 
 
 if __name__ == "__main__":
@@ -0,0 +1,172 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+from functools import cache
+
+import numpy as np
+from utils.profiling import profiled
+
+CACHE_DIRECTORY = ".cache"
+CACHE_VERSION = 3
+META_FILENAME = "meta.json"
+# bytes before the consumed offset of a log that must be unchanged
+LOG_TAIL_SIZE = 4096
+
+
+def _file_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@cache
+def _source_fingerprint(function):
+    # the source of the module defining function, past decorators like
+    # profiled, so changing how a file is parsed does not serve arrays cached
+    # by the old parser
+    with open(inspect.getsourcefile(inspect.unwrap(function)), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _loader(function, args=""):
+    return (
+        f"{function.__module__}.{function.__qualname__}{args}"
+        f"@{_source_fingerprint(function)}"
+    )
+
+
+def cache_path(file_path):
+    # the extension is kept, a .json file and its .jsonl log are cached apart
+    name = os.path.basename(file_path)
+    return os.path.join(os.path.dirname(file_path), CACHE_DIRECTORY, name)
+
+
+def _load_meta(directory):
+    meta_path = os.path.join(directory, META_FILENAME)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r") as f:
+        return json.load(f)
+
+
+def _save_meta(directory, meta):
+    with open(os.path.join(directory, META_FILENAME), "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+def _save_tree(directory, tree, prefix=""):
+    # nested dicts of arrays are stored as one .npy file per array; the layout
+    # keeps the nesting, including empty dicts
+    layout = {}
+    for key, value in tree.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            layout[key] = _save_tree(directory, value, f"{name}.")
+        else:
+            filename = f"{name}.npy"
+            np.save(os.path.join(directory, filename), value, allow_pickle=False)
+            layout[key] = filename
+    return layout
+
+
+def _load_tree(directory, layout):
+    return {
+        key: (
+            _load_tree(directory, value)
+            if isinstance(value, dict)
+            else np.load(os.path.join(directory, value), mmap_mode="r")
+        )
+        for key, value in layout.items()
+    }
+
+
+@profiled
+def cached_load(file_path, load_function, *args):
+    directory = cache_path(file_path)
+    loader = _loader(load_function, repr(args))
+    stat = os.stat(file_path)
+
+    meta = _load_meta(directory)
+    valid = meta and meta["version"] == CACHE_VERSION and meta["loader"] == loader
+    if valid and meta["mtime_ns"] == stat.st_mtime_ns and meta["size"] == stat.st_size:
+        return _load_tree(directory, meta["layout"])
+
+    # touched but unchanged files only need their recorded mtime updated
+    source_hash = _file_hash(file_path)
+    if valid and meta["sha256"] == source_hash:
+        meta["mtime_ns"] = stat.st_mtime_ns
+        meta["size"] = stat.st_size
+        _save_meta(directory, meta)
+        return _load_tree(directory, meta["layout"])
+
+    data = load_function(file_path, *args)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    layout = _save_tree(directory, data)
+    # meta.json is written last and marks the cache entry as complete
+    _save_meta(
+        directory,
+        {
+            "version": CACHE_VERSION,
+            "loader": loader,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": source_hash,
+            "layout": layout,
+        },
+    )
+    return _load_tree(directory, layout)
+
+
+def _tail_hash(file_path, offset):
+    start = max(0, offset - LOG_TAIL_SIZE)
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+
+@profiled
+def cached_log_load(file_path, read_function, build_function, *args):
+    # append-only logs are read incrementally: read_function(file_path, offset,
+    # state) adds the lines after offset to the cached state and returns the
+    # new (state, offset); build_function(state, *args) derives the data
+    directory = cache_path(file_path)
+    loader = _loader(read_function)
+    size = os.stat(file_path).st_size
+
+    state, offset = {}, 0
+    meta = _load_meta(directory)
+    if (
+        meta
+        and meta["version"] == CACHE_VERSION
+        and meta["loader"] == loader
+        and meta["offset"] <= size
+        # a log that was rewritten instead of appended to is read again
+        and meta["tail_sha256"] == _tail_hash(file_path, meta["offset"])
+    ):
+        state, offset = _load_tree(directory, meta["layout"]), meta["offset"]
+
+    if offset < size:
+        state, new_offset = read_function(file_path, offset, state)
+        if new_offset != offset:
+            shutil.rmtree(directory, ignore_errors=True)
+            os.makedirs(directory)
+            layout = _save_tree(directory, state)
+            _save_meta(
+                directory,
+                {
+                    "version": CACHE_VERSION,
+                    "loader": loader,
+                    "offset": new_offset,
+                    "tail_sha256": _tail_hash(file_path, new_offset),
+                    "layout": layout,
+                },
+            )
+            state = _load_tree(directory, layout)
+
+    return build_function(state, *args)
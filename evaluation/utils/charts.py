@@ -0,0 +1,542 @@
+from utils.compositions import (
+    DID_REGISTRY,
+    HALO_NFC_METADATA_REGISTRY,
+    NFT_REGISTRY,
+    PBT_REGISTRY,
+    passport_type_totals,
+)
+from utils.gas_costs import (
+    plot_contracts_gas_costs,
+    plot_function_calls_gas_costs,
+    plot_gas_costs,
+    plot_passport_types_gas_costs,
+    plot_passport_types_operation_gas_costs,
+)
+from utils.performance import (
+    plot_contracts_performance,
+    plot_function_calls_performance,
+    plot_passport_types_operation_performance,
+    plot_passport_types_performance,
+    plot_performance,
+)
+from utils.preprocessing import (
+    chain_name,
+    passport_type_sources,
+    process_passport_type_gas_costs_data,
+    process_passport_type_performance_data,
+    registry_chain_tables,
+    select_chain,
+)
+from utils.profiling import profiled
+from utils.rendering import render_job
+from utils.summary import (
+    plot_costs_summary,
+    plot_performance_summary,
+    plot_theoretical_criteria_summary,
+)
+
+
+@profiled
+def plot_arweave(arweave_data, outliers=None, series=None):
+    return [
+        render_job(
+            plot_performance,
+            data_list=[
+                arweave_data["create"],
+                arweave_data["read"],
+                arweave_data["update"],
+            ],
+            labels=["Create", "Read", "Update"],
+            title="Performance of Arweave Interactions using Irys Node 2",
+            output_filename="performance_arweave.png",
+            x_axis="s",
+            is_arweave=True,
+            outliers=outliers,
+            **(series or {}),
+        )
+    ]
+
+
+@profiled
+def plot_halo_nfc_metadata_registry(
+    halo_nfc_metadata_registry_data, outliers=None, series=None
+):
+    labels = {
+        "deployment": "Deployment",
+        "create": "Create",
+        "read": "Read",
+    }
+
+    title = "HaloNFCMetadataRegistry.sol"
+    output_filename_suffix = "halo_nfc_metadata_registry"
+
+    return [
+        render_job(
+            plot_performance,
+            data_list=[
+                halo_nfc_metadata_registry_data[key]
+                for key in halo_nfc_metadata_registry_data.keys()
+            ],
+            labels=list(labels.values()),
+            title=f"Performance of {title}",
+            output_filename=f"performance_{output_filename_suffix}.png",
+            x_axis="s",
+            outliers=outliers,
+            **(series or {}),
+        ),
+        render_job(
+            plot_gas_costs,
+            data_list=[
+                halo_nfc_metadata_registry_data[key]
+                for key in halo_nfc_metadata_registry_data.keys()
+            ],
+            labels=list(labels.values()),
+            title=f"Gas Costs of {title}",
+            output_filename=f"gas_costs_{output_filename_suffix}.png",
+            outliers=outliers,
+            **(series or {}),
+        ),
+    ]
+
+
+@profiled
+def plot_digital_identifier_contracts(
+    did_registry_data, nft_registry_data, pbt_registry_data, outliers=None, series=None
+):
+    labels = {
+        "deployment": "Deployment",
+        "create": "Creation",
+        "read": "Reading",
+        "update": "Update",
+        "delete": "Deletion",
+    }
+
+    registry_configs = [
+        {
+            "title": "DIDRegistry.sol",
+            "output_filename_suffix": "did_registry",
+            "data": did_registry_data,
+        },
+        {
+            "title": "NFTRegistry.sol",
+            "output_filename_suffix": "nft_registry",
+            "data": nft_registry_data,
+        },
+        {
+            "title": "PBTRegistry.sol",
+            "output_filename_suffix": "pbt_registry",
+            "data": pbt_registry_data,
+        },
+    ]
+
+    # plot_contracts_performance(registry_configs)
+    # plot_contracts_gas_costs(registry_configs)
+
+    jobs = []
+
+    for config in registry_configs:
+        registry_data = config["data"]
+        jobs.append(
+            render_job(
+                plot_performance,
+                data_list=[registry_data[key] for key in registry_data.keys()],
+                labels=list(labels.values()),
+                title=f'Performance of {config["title"]}',
+                output_filename=f'performance_{config["output_filename_suffix"]}.png',
+                x_axis="s",
+                outliers=outliers,
+                **(series or {}),
+            )
+        )
+        jobs.append(
+            render_job(
+                plot_gas_costs,
+                data_list=[registry_data[key] for key in registry_data.keys()],
+                labels=list(labels.values()),
+                title=f'Gas Costs of {config["title"]}',
+                output_filename=f'gas_costs_{config["output_filename_suffix"]}.png',
+                outliers=outliers,
+                **(series or {}),
+            )
+        )
+
+    combined_registry_data = {
+        "deployment": {
+            config["title"]: config["data"]["deployment"] for config in registry_configs
+        },
+        "create": {
+            config["title"]: config["data"]["create"] for config in registry_configs
+        },
+        "read": {
+            config["title"]: config["data"]["read"] for config in registry_configs
+        },
+        "update": {
+            config["title"]: config["data"]["update"] for config in registry_configs
+        },
+        "delete": {
+            config["title"]: config["data"]["delete"] for config in registry_configs
+        },
+    }
+
+    title_mapping = {
+        "deployment": "Deployment",
+        "create": "Creation",
+        "read": "Reading",
+        "update": "Update",
+        "delete": "Deletion",
+    }
+
+    for action_type in combined_registry_data:
+        jobs.append(
+            render_job(
+                plot_performance,
+                data_list=[
+                    combined_registry_data[action_type][key]
+                    for key in combined_registry_data[action_type].keys()
+                ],
+                labels=list(combined_registry_data[action_type].keys()),
+                title=f"Performance of Passport {title_mapping[action_type]} by Registry Contracts",
+                output_filename=f"performance_contracts_{title_mapping[action_type].lower()}.png",
+                x_axis="s",
+                outliers=outliers,
+                **(series or {}),
+            )
+        )
+        jobs.append(
+            render_job(
+                plot_gas_costs,
+                data_list=[
+                    combined_registry_data[action_type][key]
+                    for key in combined_registry_data[action_type].keys()
+                ],
+                labels=list(combined_registry_data[action_type].keys()),
+                title=f"Gas Costs for Passport {title_mapping[action_type]} by Registry Contracts",
+                output_filename=f"gas_costs_contracts_{title_mapping[action_type].lower()}.png",
+                outliers=outliers,
+                **(series or {}),
+            )
+        )
+
+    return jobs
+
+
+@profiled
+def plot_passport_types(
+    arweave_data,
+    did_registry_data,
+    halo_nfc_metadata_registry_data,
+    nft_registry_data,
+    pbt_registry_data,
+    outliers=None,
+):
+    # outliers: method whose outliers are left out of the trimmed means drawn
+    # next to the means, or None
+    jobs = []
+
+    performance_data = process_passport_type_performance_data(
+        arweave_data,
+        did_registry_data,
+        halo_nfc_metadata_registry_data,
+        nft_registry_data,
+        pbt_registry_data,
+    )
+    trimmed_performance_data = None
+    if outliers:
+        trimmed_performance_data = process_passport_type_performance_data(
+            arweave_data,
+            did_registry_data,
+            halo_nfc_metadata_registry_data,
+            nft_registry_data,
+            pbt_registry_data,
+            outliers=outliers,
+        )
+
+    for i, operation_data in enumerate(performance_data):
+        operation = operation_data["operation"]
+        data = operation_data["data"]
+        labels = operation_data["labels"]
+
+        jobs.append(
+            render_job(
+                plot_passport_types_operation_performance,
+                data=data,
+                labels=labels,
+                title=f"Performance of Passport {operation} by Passport Types",
+                output_filename=f"performance_passport_types_{operation.lower()}.png",
+                trimmed_data=(
+                    trimmed_performance_data[i]["data"] if outliers else None
+                ),
+            )
+        )
+
+    jobs.append(
+        render_job(
+            plot_passport_types_performance,
+            performance_data=performance_data,
+            output_filename="performance_passport_types.png",
+            trimmed_performance_data=trimmed_performance_data,
+        )
+    )
+
+    gast_costs_data = process_passport_type_gas_costs_data(
+        did_registry_data,
+        halo_nfc_metadata_registry_data,
+        nft_registry_data,
+        pbt_registry_data,
+    )
+    costs_usd_data = process_passport_type_gas_costs_data(
+        did_registry_data,
+        halo_nfc_metadata_registry_data,
+        nft_registry_data,
+        pbt_registry_data,
+        metric="costs_usd",
+    )
+    trimmed_gas_costs_data = None
+    trimmed_usd_data = None
+    if outliers:
+        trimmed_gas_costs_data = process_passport_type_gas_costs_data(
+            did_registry_data,
+            halo_nfc_metadata_registry_data,
+            nft_registry_data,
+            pbt_registry_data,
+            outliers=outliers,
+        )
+        trimmed_usd_data = process_passport_type_gas_costs_data(
+            did_registry_data,
+            halo_nfc_metadata_registry_data,
+            nft_registry_data,
+            pbt_registry_data,
+            outliers=outliers,
+            metric="costs_usd",
+        )
+
+    for i, (operation_data, usd_data) in enumerate(
+        zip(gast_costs_data, costs_usd_data)
+    ):
+        operation = operation_data["operation"]
+        data = operation_data["data"]
+        labels = operation_data["labels"]
+
+        jobs.append(
+            render_job(
+                plot_passport_types_operation_gas_costs,
+                data=data,
+                labels=labels,
+                title=f"Gas Costs for Passport {operation} by Passport Types",
+                output_filename=f"gas_costs_passport_types_{operation.lower()}.png",
+                usd_data=usd_data["data"],
+                trimmed_data=trimmed_gas_costs_data[i]["data"] if outliers else None,
+                trimmed_usd_data=trimmed_usd_data[i]["data"] if outliers else None,
+            )
+        )
+
+    jobs.append(
+        render_job(
+            plot_passport_types_gas_costs,
+            gas_costs_data=gast_costs_data,
+            output_filename="gas_costs_passport_types.png",
+            costs_usd_data=costs_usd_data,
+            trimmed_gas_costs_data=trimmed_gas_costs_data,
+            trimmed_costs_usd_data=trimmed_usd_data,
+        )
+    )
+
+    return jobs
+
+
+@profiled
+def plot_summary(
+    arweave_data,
+    did_registry_data,
+    halo_nfc_metadata_registry_data,
+    nft_registry_data,
+    pbt_registry_data,
+    outliers=None,
+):
+    sources = passport_type_sources(
+        arweave_data,
+        did_registry_data,
+        halo_nfc_metadata_registry_data,
+        nft_registry_data,
+        pbt_registry_data,
+    )
+
+    return [
+        render_job(
+            plot_performance_summary,
+            duration_totals=passport_type_totals(sources, "duration"),
+            output_filename="summary_performance.png",
+            trimmed_duration_totals=(
+                passport_type_totals(sources, "duration", outliers=outliers)
+                if outliers
+                else None
+            ),
+        ),
+        render_job(
+            plot_costs_summary,
+            costs_usd_totals=passport_type_totals(sources, "costs_usd"),
+            output_filename="summary_costs.png",
+            trimmed_costs_usd_totals=(
+                passport_type_totals(sources, "costs_usd", outliers=outliers)
+                if outliers
+                else None
+            ),
+        ),
+        render_job(
+            plot_theoretical_criteria_summary,
+            output_filename="summary_theoretical_criteria.png",
+        ),
+    ]
+
+
+@profiled
+def plot_function_calls(registry_calls):
+    titles = {
+        DID_REGISTRY: "DIDRegistry.sol",
+        HALO_NFC_METADATA_REGISTRY: "HaloNFCMetadataRegistry.sol",
+        NFT_REGISTRY: "NFTRegistry.sol",
+        PBT_REGISTRY: "PBTRegistry.sol",
+    }
+    output_filename_suffixes = {
+        DID_REGISTRY: "did_registry",
+        HALO_NFC_METADATA_REGISTRY: "halo_nfc_metadata_registry",
+        NFT_REGISTRY: "nft_registry",
+        PBT_REGISTRY: "pbt_registry",
+    }
+    xlabels = {
+        "deployment": "Deployment",
+        "create": "Creation",
+        "read": "Reading",
+        "update": "Update",
+        "delete": "Deletion",
+    }
+
+    jobs = []
+
+    for registry, calls in registry_calls.items():
+        jobs.append(
+            render_job(
+                plot_function_calls_performance,
+                calls=calls,
+                xlabels=xlabels,
+                title=f"Performance of {titles[registry]} by Function",
+                output_filename=f"performance_calls_{output_filename_suffixes[registry]}.png",
+            )
+        )
+        jobs.append(
+            render_job(
+                plot_function_calls_gas_costs,
+                calls=calls,
+                xlabels=xlabels,
+                title=f"Gas Costs of {titles[registry]} by Function",
+                output_filename=f"gas_costs_calls_{output_filename_suffixes[registry]}.png",
+            )
+        )
+
+    return jobs
+
+
+@profiled
+def plot_chains(registry_chains, outliers=None, series=None):
+    # only registries measured on more than one chain get a comparison
+    output_filename_suffixes = {
+        DID_REGISTRY: "did_registry",
+        HALO_NFC_METADATA_REGISTRY: "halo_nfc_metadata_registry",
+        NFT_REGISTRY: "nft_registry",
+        PBT_REGISTRY: "pbt_registry",
+    }
+
+    title_mapping = {
+        "deployment": "Deployment",
+        "create": "Creation",
+        "read": "Reading",
+        "update": "Update",
+        "delete": "Deletion",
+    }
+
+    jobs = []
+
+    for registry, chains in registry_chains.items():
+        if len(chains) < 2:
+            continue
+
+        for action_type, title in title_mapping.items():
+            data_list = [chains[chain_id][action_type] for chain_id in chains]
+            if not all(data_list):
+                continue
+
+            labels = [chain_name(chain_id) for chain_id in chains]
+            jobs.append(
+                render_job(
+                    plot_performance,
+                    data_list=data_list,
+                    labels=labels,
+                    title=f"Performance of {registry}.sol {title} by Chain",
+                    output_filename=f"performance_chains_{output_filename_suffixes[registry]}_{title.lower()}.png",
+                    x_axis="s",
+                    outliers=outliers,
+                    **(series or {}),
+                    network=None,
+                )
+            )
+            jobs.append(
+                render_job(
+                    plot_gas_costs,
+                    data_list=data_list,
+                    labels=labels,
+                    title=f"Gas Costs of {registry}.sol {title} by Chain",
+                    output_filename=f"gas_costs_chains_{output_filename_suffixes[registry]}_{title.lower()}.png",
+                    outliers=outliers,
+                    **(series or {}),
+                    network=None,
+                )
+            )
+
+    return jobs
+
+
+@profiled
+def plan_render_jobs(arweave_data, registry_stores, outliers=None, series=None):
+    # outliers: method whose outliers are marked in the line charts and left
+    # out of the trimmed means of the bar charts and heatmaps, or None;
+    # series: keyword arguments of prepare_series for the line charts, e.g.
+    # {"interval": "5min", "statistic": "p95"}, or None for the runs
+    registry_chains = registry_chain_tables(registry_stores, "runs")
+    registry_calls = {
+        registry: select_chain(chains)
+        for registry, chains in registry_chain_tables(registry_stores, "calls").items()
+    }
+    did_registry_data = select_chain(registry_chains[DID_REGISTRY])
+    halo_nfc_metadata_registry_data = select_chain(
+        registry_chains[HALO_NFC_METADATA_REGISTRY]
+    )
+    nft_registry_data = select_chain(registry_chains[NFT_REGISTRY])
+    pbt_registry_data = select_chain(registry_chains[PBT_REGISTRY])
+
+    return [
+        *plot_arweave(arweave_data, outliers, series),
+        *plot_halo_nfc_metadata_registry(
+            halo_nfc_metadata_registry_data, outliers, series
+        ),
+        *plot_digital_identifier_contracts(
+            did_registry_data, nft_registry_data, pbt_registry_data, outliers, series
+        ),
+        *plot_passport_types(
+            arweave_data,
+            did_registry_data,
+            halo_nfc_metadata_registry_data,
+            nft_registry_data,
+            pbt_registry_data,
+            outliers,
+        ),
+        *plot_summary(
+            arweave_data,
+            did_registry_data,
+            halo_nfc_metadata_registry_data,
+            nft_registry_data,
+            pbt_registry_data,
+            outliers,
+        ),
+        *plot_function_calls(registry_calls),
+        *plot_chains(registry_chains, outliers, series),
+    ]
@@ -0,0 +1,223 @@
+import numpy as np
+from utils.profiling import profiled
+from utils.statistics import column_statistic
+from utils.store import ACTIONS
+
+ARWEAVE = "Arweave"
+DID_REGISTRY = "DIDRegistry"
+NFT_REGISTRY = "NFTRegistry"
+PBT_REGISTRY = "PBTRegistry"
+HALO_NFC_METADATA_REGISTRY = "HaLoNFCMetadataRegistry"
+
+REGISTRIES = [
+    DID_REGISTRY,
+    HALO_NFC_METADATA_REGISTRY,
+    NFT_REGISTRY,
+    PBT_REGISTRY,
+]
+
+# metric -> (column, divisor)
+METRICS = {
+    "duration": ("durationInMs", 1000),
+    "gas_costs": ("gasCostsInWei", 1),
+    # gas costs priced at the ETH/USD rate of every run, see utils.prices
+    "costs_usd": ("gasCostsInUsd", 1),
+}
+
+deployment_labels = [
+    "1. Sepolia: NFT, PBT, or DID Registry Contract Deployment",
+    "2. Sepolia: HaLo NFC Metadata Registry Contract Deployment",
+]
+
+create_labels = [
+    "1. Arweave: Upload Passport Data",
+    "2. Sepolia: Create Identifier on Registry Contract",
+    "3. Arweave: Upload Passport Metadata",
+    "4. Sepolia: Store MetadataURI on HaLo NFC Metadata Registry Contract",
+]
+
+read_labels = [
+    "1. Sepolia: Read MetadataURI from Registry Contract",
+    "2. Arweave: Read Passport Metadata",
+    "3. Sepolia: Read PassportURI from Registry Contract",
+    "4. Arweave: Read Passport Data",
+]
+
+update_labels = [
+    "1. Arweave: Upload Passport Data",
+    "2. Sepolia: Update Identifier on Registry Contract",
+]
+
+delete_labels = [
+    "1. Sepolia: Delete Identifier on Registry Contract",
+]
+
+# operation -> the steps shown in its stacked bar chart, in order
+OPERATIONS = {
+    "Deployment": deployment_labels,
+    "Creation": create_labels,
+    "Reading": read_labels,
+    "Update": update_labels,
+    "Deletion": delete_labels,
+}
+
+
+def passport_type_composition(registry, metadata_registry=None):
+    # operation -> [(label, source, action, metric)]; metric is a key of
+    # METRICS, or None for the metric the composition is evaluated on. Steps a
+    # passport type doesn't need are left out and count as 0
+    composition = {
+        "Deployment": [
+            (deployment_labels[0], registry, "deployment", None),
+        ],
+        "Creation": [
+            (create_labels[0], ARWEAVE, "create", None),
+            (create_labels[1], registry, "create", None),
+            (create_labels[2], ARWEAVE, "create", None),
+        ],
+        "Reading": [
+            (read_labels[1], ARWEAVE, "read", None),
+            (read_labels[2], registry, "read", None),
+            (read_labels[3], ARWEAVE, "read", None),
+        ],
+        "Update": [
+            (update_labels[0], ARWEAVE, "update", None),
+            (update_labels[1], registry, "update", None),
+        ],
+        "Deletion": [
+            (delete_labels[0], registry, "delete", None),
+        ],
+    }
+    if metadata_registry:
+        composition["Deployment"].append(
+            (deployment_labels[1], metadata_registry, "deployment", None)
+        )
+        composition["Creation"].append(
+            (create_labels[3], metadata_registry, "create", None)
+        )
+        composition["Reading"].insert(
+            0, (read_labels[0], metadata_registry, "read", None)
+        )
+    return composition
+
+
+PASSPORT_TYPES = {
+    "QR Code x NFT": passport_type_composition(NFT_REGISTRY),
+    "QR Code x DID": passport_type_composition(DID_REGISTRY),
+    "HaLo NFC x PBT": passport_type_composition(
+        PBT_REGISTRY, HALO_NFC_METADATA_REGISTRY
+    ),
+    "HaLo NFC x DID": passport_type_composition(
+        DID_REGISTRY, HALO_NFC_METADATA_REGISTRY
+    ),
+}
+
+
+def source_statistics_matrix(sources, metric, statistic="mean", outliers=None):
+    # (source, action) matrix of the chosen statistic; missing columns, e.g. gas
+    # costs of Arweave, are 0. Counts are not scaled by the divisor.
+    column, divisor = METRICS[metric]
+    if statistic == "count":
+        divisor = 1
+    matrix = np.zeros((len(sources), len(ACTIONS)))
+    for i, data in enumerate(sources.values()):
+        for j, action in enumerate(ACTIONS):
+            if action in data:
+                matrix[i, j] = column_statistic(
+                    data[action], column, statistic, outliers
+                )
+    return matrix / divisor
+
+
+def step_metrics(metric, passport_types):
+    # the evaluated metric first, then the other metrics steps ask for
+    fixed = {
+        step[3]
+        for composition in passport_types.values()
+        for steps in composition.values()
+        for step in steps
+        if step[3] not in (None, metric)
+    }
+    return [metric, *sorted(fixed)]
+
+
+def composition_indices(source_names, metric_names, passport_types, operations):
+    # flat indices into the (metric, source, action) statistics array with
+    # shape (operation, passport type, step); -1 marks steps that count as 0
+    max_steps = max(len(labels) for labels in operations.values())
+    indices = np.full((len(operations), len(passport_types), max_steps), -1)
+    for i, (operation, labels) in enumerate(operations.items()):
+        for j, composition in enumerate(passport_types.values()):
+            for label, source, action, metric in composition.get(operation, []):
+                if source not in source_names:
+                    continue
+                metric_index = metric_names.index(metric) if metric else 0
+                source_index = source_names.index(source)
+                action_index = ACTIONS.index(action)
+                indices[i, j, labels.index(label)] = (
+                    metric_index * len(source_names) + source_index
+                ) * len(ACTIONS) + action_index
+    return indices
+
+
+def composition_values(
+    sources,
+    metric,
+    statistic="mean",
+    passport_types=PASSPORT_TYPES,
+    operations=OPERATIONS,
+    outliers=None,
+):
+    # (operation, passport type, step) array of step values
+    metric_names = step_metrics(metric, passport_types)
+    matrix = np.stack(
+        [
+            source_statistics_matrix(sources, name, statistic, outliers)
+            for name in metric_names
+        ]
+    )
+    indices = composition_indices(
+        list(sources), metric_names, passport_types, operations
+    )
+    return np.where(indices >= 0, matrix.ravel()[indices], 0)
+
+
+@profiled
+def passport_type_totals(
+    sources,
+    metric,
+    statistic="mean",
+    passport_types=PASSPORT_TYPES,
+    operations=OPERATIONS,
+    outliers=None,
+):
+    # (operation, passport type) matrix of the stacked totals
+    return composition_values(
+        sources, metric, statistic, passport_types, operations, outliers
+    ).sum(axis=2)
+
+
+@profiled
+def evaluate_passport_types(
+    sources,
+    metric,
+    statistic="mean",
+    passport_types=PASSPORT_TYPES,
+    operations=OPERATIONS,
+    outliers=None,
+):
+    values = composition_values(
+        sources, metric, statistic, passport_types, operations, outliers
+    )
+
+    return [
+        {
+            "operation": operation,
+            "data": {
+                passport_type: values[i, j, : len(labels)].tolist()
+                for j, passport_type in enumerate(passport_types)
+            },
+            "labels": labels,
+        }
+        for i, (operation, labels) in enumerate(operations.items())
+    ]
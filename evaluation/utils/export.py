@@ -0,0 +1,256 @@
+import importlib.util
+import os
+
+import numpy as np
+import pandas as pd
+from utils.compositions import (
+    ARWEAVE,
+    DID_REGISTRY,
+    HALO_NFC_METADATA_REGISTRY,
+    NFT_REGISTRY,
+    OPERATIONS,
+    PASSPORT_TYPES,
+    PBT_REGISTRY,
+    composition_values,
+    passport_type_totals,
+)
+from utils.fees import (
+    SCENARIO_ETH_TO_USD,
+    SCENARIO_GAS_PRICES_IN_GWEI,
+    gas_price_statistics,
+    projection_rows,
+    registry_function_gas_used,
+)
+from utils.outliers import outlier_flags
+from utils.preprocessing import (
+    passport_type_sources,
+    registry_chain_tables,
+    select_chain,
+)
+from utils.profiling import profiled
+from utils.statistics import (
+    chain_statistics_rows,
+    function_statistics_rows,
+    statistics_rows,
+)
+
+TABLES_PATH = "tables"
+TABLE_FORMATS = ["csv", "json", "parquet"]
+# pandas reads and writes Parquet with either of them
+PARQUET_ENGINES = ["pyarrow", "fastparquet"]
+
+
+def check_table_format(table_format):
+    if table_format not in TABLE_FORMATS:
+        raise ValueError(
+            f"Invalid table format. Choose one of {', '.join(TABLE_FORMATS)}."
+        )
+    if table_format == "parquet" and not any(
+        importlib.util.find_spec(engine) for engine in PARQUET_ENGINES
+    ):
+        raise ValueError("Parquet needs pyarrow or fastparquet, see requirements.txt.")
+
+
+def by_chain(registry_chains):
+    # registry -> chain id -> data to chain id -> registry -> data
+    chains = {}
+    for registry, data_by_chain in registry_chains.items():
+        for chain_id, data in data_by_chain.items():
+            chains.setdefault(chain_id, {})[registry] = data
+    return chains
+
+
+def chain_function_statistics_rows(chains, column, scale=1, outliers=None):
+    # chains: chain id -> registry name -> "calls" of a load_chain_stores store
+    return [
+        {"chain": chain_id, **row}
+        for chain_id, registry_calls in chains.items()
+        for row in function_statistics_rows(
+            registry_calls, column, scale, outliers=outliers
+        )
+    ]
+
+
+def fee_rows(
+    chains,
+    gas_prices_in_gwei=SCENARIO_GAS_PRICES_IN_GWEI,
+    eth_to_usd_rates=SCENARIO_ETH_TO_USD,
+):
+    # chains: chain id -> registry name -> load_chain_stores output of the chain;
+    # the contract functions' gasUsed, the observed gas prices and the costs
+    # projected to every combination of gas price and ETH/USD rate
+    tables = {"function_gas_used": [], "registry_gas_prices": [], "fee_projections": []}
+    for chain_id, stores in chains.items():
+        for registry, store in stores.items():
+            key = {"chain": chain_id, "registry": registry}
+            tables["function_gas_used"] += [
+                {**key, "action": action, "functionName": function, **summary}
+                for action, functions in registry_function_gas_used(store).items()
+                for function, summary in functions.items()
+            ]
+            tables["registry_gas_prices"] += [
+                {**key, "action": action, **summary}
+                for action, summary in gas_price_statistics(store["runs"]).items()
+            ]
+            tables["fee_projections"] += [
+                {**key, **row}
+                for row in projection_rows(
+                    store["runs"], gas_prices_in_gwei, eth_to_usd_rates
+                )
+            ]
+    return tables
+
+
+def outlier_rows(chains, outliers="iqr"):
+    # every run flagged on its duration or gas costs
+    rows = []
+    for chain_id, registries in chains.items():
+        for registry, data in registries.items():
+            for action, columns in data.items():
+                if "run" not in columns:
+                    continue
+                duration_flags = outlier_flags(columns["durationInMs"], outliers)
+                gas_costs_flags = outlier_flags(columns["gasCostsInWei"], outliers)
+                for i in np.flatnonzero(duration_flags | gas_costs_flags):
+                    rows.append(
+                        {
+                            "chain": chain_id,
+                            "registry": registry,
+                            "action": action,
+                            "run": columns["run"][i],
+                            "durationInMs": columns["durationInMs"][i],
+                            "gasCostsInWei": columns["gasCostsInWei"][i],
+                            "durationOutlier": duration_flags[i],
+                            "gasCostsOutlier": gas_costs_flags[i],
+                        }
+                    )
+    return rows
+
+
+def passport_type_rows(totals, passport_types=PASSPORT_TYPES, operations=OPERATIONS):
+    # one row per passport type and a column per operation, the layout of the
+    # data/*-means.csv files
+    return [
+        {
+            "prototype": passport_type,
+            **{
+                operation.lower(): totals[i, j]
+                for i, operation in enumerate(operations)
+            },
+        }
+        for j, passport_type in enumerate(passport_types)
+    ]
+
+
+def passport_type_step_rows(
+    sources, passport_types=PASSPORT_TYPES, operations=OPERATIONS
+):
+    # the steps of the stacked bar charts, one row per operation, passport type
+    # and step
+    durations = composition_values(sources, "duration")
+    gas_costs = composition_values(sources, "gas_costs")
+    costs_usd = composition_values(sources, "costs_usd")
+    return [
+        {
+            "operation": operation,
+            "prototype": passport_type,
+            "step": label,
+            "durationInS": durations[i, j, k],
+            "gasCostsInWei": gas_costs[i, j, k],
+            "gasCostsInUsd": costs_usd[i, j, k],
+        }
+        for i, (operation, labels) in enumerate(operations.items())
+        for j, passport_type in enumerate(passport_types)
+        for k, label in enumerate(labels)
+    ]
+
+
+def passport_type_tables(sources, outliers=None):
+    durations = passport_type_totals(sources, "duration", outliers=outliers)
+    gas_costs = passport_type_totals(sources, "gas_costs", outliers=outliers)
+    costs_usd = passport_type_totals(sources, "costs_usd", outliers=outliers)
+    return {
+        "passport_type_performance": passport_type_rows(durations),
+        "passport_type_gas_costs": passport_type_rows(gas_costs),
+        "passport_type_costs_usd": passport_type_rows(costs_usd),
+    }
+
+
+@profiled
+def compute_tables(
+    arweave_data,
+    registry_stores,
+    outliers=None,
+    gas_prices_in_gwei=SCENARIO_GAS_PRICES_IN_GWEI,
+    eth_to_usd_rates=SCENARIO_ETH_TO_USD,
+):
+    # table name -> rows; registry tables cover every chain, passport types are
+    # evaluated on Sepolia like the plots. With outliers, the statistics tables
+    # get trimmed_* columns and trimmed passport type tables are added. The fee
+    # projections combine every gas price with every ETH/USD rate.
+    chain_runs = by_chain(registry_chain_tables(registry_stores, "runs"))
+    chain_calls = by_chain(registry_chain_tables(registry_stores, "calls"))
+
+    registry_data = {
+        registry: select_chain(chains)
+        for registry, chains in registry_chain_tables(registry_stores, "runs").items()
+    }
+    sources = passport_type_sources(
+        arweave_data,
+        registry_data[DID_REGISTRY],
+        registry_data[HALO_NFC_METADATA_REGISTRY],
+        registry_data[NFT_REGISTRY],
+        registry_data[PBT_REGISTRY],
+    )
+    tables = {
+        "arweave_performance": statistics_rows(
+            {ARWEAVE: arweave_data}, "durationInMs", 1000, outliers=outliers
+        ),
+        "registry_performance": chain_statistics_rows(
+            chain_runs, "durationInMs", 1000, outliers=outliers
+        ),
+        "registry_gas_costs": chain_statistics_rows(
+            chain_runs, "gasCostsInWei", outliers=outliers
+        ),
+        "registry_costs_usd": chain_statistics_rows(
+            chain_runs, "gasCostsInUsd", outliers=outliers
+        ),
+        "function_performance": chain_function_statistics_rows(
+            chain_calls, "durationInMs", 1000, outliers
+        ),
+        "function_gas_costs": chain_function_statistics_rows(
+            chain_calls, "gasCostsInWei", outliers=outliers
+        ),
+        **passport_type_tables(sources),
+        "passport_type_steps": passport_type_step_rows(sources),
+        **fee_rows(by_chain(registry_stores), gas_prices_in_gwei, eth_to_usd_rates),
+    }
+    if outliers:
+        tables.update(
+            {
+                f"{name}_trimmed": rows
+                for name, rows in passport_type_tables(sources, outliers).items()
+            }
+        )
+        tables["outlier_runs"] = outlier_rows(chain_runs, outliers)
+    return tables
+
+
+def write_table(rows, file_path, table_format="csv"):
+    check_table_format(table_format)
+    frame = pd.DataFrame(rows)
+    if table_format == "csv":
+        frame.to_csv(file_path, index=False)
+    elif table_format == "json":
+        frame.to_json(file_path, orient="records", indent=2)
+    else:
+        frame.to_parquet(file_path, index=False)
+
+
+@profiled
+def write_tables(tables, table_format="csv", output_path=TABLES_PATH):
+    os.makedirs(output_path, exist_ok=True)
+    for name, rows in tables.items():
+        write_table(
+            rows, os.path.join(output_path, f"{name}.{table_format}"), table_format
+        )
@@ -0,0 +1,94 @@
+import numpy as np
+from utils.statistics import STATISTICS, column_statistic, summarize
+from utils.store import group_by_function
+from utils.units import ETH_CONVERSION, ETH_TO_USD
+
+GWEI_CONVERSION = 1e9
+# default scenarios of the fee projections: every gas price is combined with
+# every ETH/USD rate
+SCENARIO_GAS_PRICES_IN_GWEI = [1, 10, 30, 100]
+SCENARIO_ETH_TO_USD = [2000, ETH_TO_USD, 5000]
+
+
+def function_gas_used(steps, statistics=STATISTICS):
+    # gasUsed distribution per contract function of one action's step table;
+    # gasUsed only depends on the contract, not on the network conditions
+    return {
+        function_name: summarize(calls["gasUsed"], statistics)
+        for function_name, calls in group_by_function(steps).items()
+    }
+
+
+def registry_function_gas_used(store, statistics=STATISTICS):
+    # store: output of load_registry_store
+    return {
+        action: function_gas_used(steps, statistics)
+        for action, steps in store["steps"].items()
+    }
+
+
+def gas_price_statistics(data, statistics=STATISTICS):
+    # observed effective gas prices per action, i.e. the network conditions
+    return {
+        action: summarize(columns.get("effectiveGasPriceInWei", []), statistics)
+        for action, columns in data.items()
+    }
+
+
+def usd_per_gas(gas_prices_in_wei, eth_to_usd_rates=ETH_TO_USD):
+    # (gas price, rate) matrix: every gas price is combined with every rate
+    return (
+        np.multiply.outer(
+            np.atleast_1d(np.asarray(gas_prices_in_wei, dtype=np.float64)),
+            np.atleast_1d(np.asarray(eth_to_usd_rates, dtype=np.float64)),
+        )
+        / ETH_CONVERSION
+    )
+
+
+def cost_projections(
+    data,
+    gas_prices_in_wei,
+    eth_to_usd_rates=ETH_TO_USD,
+    statistic="mean",
+):
+    # (action, gas price, rate) array of projected USD costs. Repricing scales
+    # every run by the same positive factor, so any statistic except the count
+    # can be taken on gasUsed first and multiplied with the scenarios after.
+    if statistic == "count":
+        raise ValueError("The count of runs does not depend on the scenario.")
+
+    gas_used_statistic = np.array(
+        [column_statistic(columns, "gasUsed", statistic) for columns in data.values()],
+        dtype=np.float64,
+    )
+    return np.multiply.outer(
+        gas_used_statistic, usd_per_gas(gas_prices_in_wei, eth_to_usd_rates)
+    )
+
+
+def projection_rows(
+    data,
+    gas_prices_in_gwei=SCENARIO_GAS_PRICES_IN_GWEI,
+    eth_to_usd_rates=SCENARIO_ETH_TO_USD,
+    statistic="mean",
+):
+    # one row per action with runs, gas price and ETH/USD rate
+    data = {action: columns for action, columns in data.items() if columns}
+    projections = cost_projections(
+        data,
+        np.asarray(gas_prices_in_gwei, dtype=np.float64) * GWEI_CONVERSION,
+        eth_to_usd_rates,
+        statistic,
+    )
+    return [
+        {
+            "action": action,
+            "gasPriceInGwei": gas_price,
+            "ethToUsd": rate,
+            f"{statistic}CostsInUsd": projections[i, j, k],
+        }
+        for i, action in enumerate(data)
+        for j, gas_price in enumerate(gas_prices_in_gwei)
+        for k, rate in enumerate(eth_to_usd_rates)
+    ]
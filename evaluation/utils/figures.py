@@ -0,0 +1,65 @@
+from functools import cache
+
+import matplotlib
+import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
+from matplotlib import font_manager
+
+# plots are only ever written to files
+matplotlib.use("Agg")
+
+FONT_FAMILY = "Arial"
+FALLBACK_FONT_FAMILY = "DejaVu Sans"
+
+SUBPLOT_PARAMS = ["left", "right", "bottom", "top", "wspace", "hspace"]
+
+_figure = None
+
+
+@cache
+def resolve_font_family(family=FONT_FAMILY):
+    # looked up once per process; an unavailable family would otherwise be
+    # searched for (and warned about) for every single text element
+    try:
+        font_manager.findfont(family, fallback_to_default=False)
+        return family
+    except ValueError:
+        return FALLBACK_FONT_FAMILY
+
+
+def apply_style():
+    plt.rcParams["font.family"] = resolve_font_family()
+
+
+def new_figure(figsize=(16, 8)):
+    # one figure per process is cleared and reused for every chart
+    global _figure
+    if _figure is None:
+        _figure = plt.figure(figsize=figsize)
+    else:
+        _figure.clear()
+        _figure.set_size_inches(figsize)
+        # tight_layout() changes the subplot parameters of the figure
+        _figure.subplotpars.update(
+            **{
+                param: plt.rcParams[f"figure.subplot.{param}"]
+                for param in SUBPLOT_PARAMS
+            }
+        )
+        plt.figure(_figure.number)
+    return _figure
+
+
+def new_subplots(figsize=(16, 8)):
+    fig = new_figure(figsize)
+    return fig, fig.add_subplot()
+
+
+def format_time_axis(ax):
+    # numeric datetime x-axis; the date moves to the axis offset text
+    locator = mdates.AutoDateLocator()
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+
+
+apply_style()
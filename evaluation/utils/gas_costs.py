@@ -2,7 +2,7 @@ import os
 
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
+from utils.figures import format_time_axis, new_subplots
 from utils.helpers import (
     GAS_COSTS_LABEL_SIZE,
     GAS_COSTS_TITLE_SIZE,
@@ -10,39 +10,80 @@ from utils.helpers import (
     SHOW_TITLE,
     X_PAD,
     Y_PAD,
-    eth_to_usd,
-    usd_to_eth,
-    wei_to_eth,
+    gas_costs_legend,
+    operation_sums,
+    plot_grouped_bar_labels,
+    plot_stacked_bar_chart,
+    plot_trimmed_marks,
+    with_trimmed,
 )
+from utils.preprocessing import function_call_means
+from utils.prices import effective_rate, rate_functions, usd_costs
+from utils.store import column_mean, local_start_times
+from utils.timeseries import MAX_MARKERS, MAX_POINTS, prepare_series
+from utils.units import ether_label, ether_unit, eth_to_usd, wei_to_eth
 
-plt.rcParams["font.family"] = "Arial"
 
+def plot_gas_costs(
+    data_list,
+    labels,
+    title,
+    output_filename,
+    interval=None,
+    rolling_window=None,
+    statistic="mean",
+    max_points=MAX_POINTS,
+    outliers=None,
+    network="Sepolia",
+):
+    # USD amounts are priced at the ETH/USD rate of every run's start;
+    # network: the chain of the runs, None for a comparison of several chains
+    fig, ax = new_subplots()
+    unit = ether_unit(network)
 
-def plot_gas_costs(data_list, labels, title, output_filename):
-    fig, ax = plt.subplots(figsize=(16, 8))
-
+    total_ether = 0
+    total_usd = 0
     for data, label in zip(data_list, labels):
-        df = pd.DataFrame(data)
-        df["startTimestamp"] = (
-            pd.to_datetime(df["startTimestamp"], unit="ms")
-            .dt.tz_localize("UTC")
-            .dt.tz_convert("Europe/Zurich")
-        )
-        df["formattedTimestamp"] = (
-            df["startTimestamp"].dt.floor("5min").dt.strftime("%H:%M")
+        gas_costs_in_ether = wei_to_eth(data["gasCostsInWei"])
+        gas_costs_in_usd = usd_costs(data)
+        total_ether += gas_costs_in_ether.sum()
+        total_usd += gas_costs_in_usd.sum()
+
+        legend, flags = gas_costs_legend(
+            data, gas_costs_in_ether, gas_costs_in_usd, unit, outliers
         )
-        df["gasCostsInEther"] = wei_to_eth(df["gasCostsInWei"])
 
-        mean_gas_costs_eth = df["gasCostsInEther"].mean()
+        times, values = prepare_series(
+            local_start_times(data),
+            gas_costs_in_ether,
+            interval,
+            rolling_window,
+            statistic,
+            max_points,
+        )
 
-        ax.plot(
-            df["formattedTimestamp"],
-            df["gasCostsInEther"],
-            label=f"{label} (Mean: {mean_gas_costs_eth:.6f} SETH / {eth_to_usd(mean_gas_costs_eth):.2f} USD)",
-            marker="o",
+        (line,) = ax.plot(
+            times,
+            values,
+            label=f"{label} ({legend})",
+            marker="o" if len(values) <= MAX_MARKERS else None,
         )
+        if outliers:
+            # the flagged runs are crossed out on top of the series
+            ax.scatter(
+                local_start_times(data).to_numpy()[flags],
+                gas_costs_in_ether[flags],
+                marker="x",
+                s=150,
+                color=line.get_color(),
+                zorder=3,
+            )
+    format_time_axis(ax)
 
-    secax = ax.secondary_yaxis("right", functions=(eth_to_usd, usd_to_eth))
+    # one axis for all series, at the rate of the plotted runs as a whole
+    secax = ax.secondary_yaxis(
+        "right", functions=rate_functions(effective_rate(total_ether, total_usd))
+    )
     secax.set_ylabel(
         "USD",
         fontsize=GAS_COSTS_LABEL_SIZE,
@@ -56,12 +97,12 @@ def plot_gas_costs(data_list, labels, title, output_filename):
             pad=X_PAD,
         )
     ax.set_xlabel(
-        "Execution Time on Sepolia (2024-06-14 HH:MM CEST)",
+        f'Execution Time {f"on {network} " if network else ""}(CEST)',
         fontsize=GAS_COSTS_LABEL_SIZE,
         labelpad=X_PAD,
     )
     ax.set_ylabel(
-        "Sepolia ETH (SETH)",
+        ether_label(network),
         fontsize=GAS_COSTS_LABEL_SIZE,
         labelpad=X_PAD,
     )
@@ -90,7 +131,15 @@ def plot_gas_costs(data_list, labels, title, output_filename):
         os.path.join(OUTPUT_PATH, output_filename),
         bbox_inches="tight",
     )
-    plt.close()
+
+
+def format_gas_costs(values_in_ether, values_in_usd=None):
+    # "<ETH> / <USD>", USD at ETH_TO_USD unless given
+    if values_in_usd is None:
+        values_in_usd = eth_to_usd(values_in_ether)
+    return np.char.add(
+        np.char.mod("%.6f / ", values_in_ether), np.char.mod("%.2f", values_in_usd)
+    )
 
 
 def _plot_stacked_bar_chart(
@@ -99,108 +148,51 @@ def _plot_stacked_bar_chart(
     title,
     xlabels,
     output_filename,
+    usd_data=None,
     show_legend_inside_chart=False,
+    trimmed_data=None,
+    trimmed_usd_data=None,
 ):
-    # wei to eth
-    data = {key: [wei_to_eth(value) for value in data[key]] for key in data.keys()}
-
-    fig, ax = plt.subplots(figsize=(16, 8))
-
-    x = range(len(xlabels))
-    bottoms = np.zeros(len(xlabels))
-
-    max_height = 0
-    for i, label in enumerate(labels):
-        values = [data[key][i] for key in xlabels]
-        bars = ax.bar(x, values, bottom=bottoms, label=label)
-        for j, bar in enumerate(bars):
-            height = bar.get_height()
-            if height != 0:
-                ax.text(
-                    bar.get_x() + bar.get_width() / 2,
-                    bottoms[j] + height / 2,
-                    f"{height:.6f} / {eth_to_usd(height):.2f}",
-                    ha="center",
-                    va="center",
-                    fontsize=GAS_COSTS_LABEL_SIZE,
-                )
-            bottoms[j] += height
-
-            max_height = max(max_height, bottoms[j])
-
-    total_gas_costs = {key: sum(data[key]) for key in xlabels}
-    for i, (key, total) in enumerate(total_gas_costs.items()):
-        data_count = sum(1 for value in data[key] if value > 0)
-        if data_count > 1:
-            ax.text(
-                x[i],
-                bottoms[i] + 0.007 * max(bottoms),
-                f"Total:\n{total:.6f} / {eth_to_usd(total):.2f}",
-                ha="center",
-                va="bottom",
-                fontsize=GAS_COSTS_LABEL_SIZE,
-                color="black",
-            )
-
-    ax.set_ylim(0, max_height * 1.2)
-
-    secax = ax.secondary_yaxis("right", functions=(eth_to_usd, usd_to_eth))
-    secax.set_ylabel(
-        "USD",
-        fontsize=GAS_COSTS_LABEL_SIZE,
-        labelpad=X_PAD,
-    )
-
-    if SHOW_TITLE:
-        ax.set_title(
-            title,
-            fontsize=GAS_COSTS_TITLE_SIZE,
-            pad=X_PAD,
-        )
-    ax.set_ylabel(
-        "Sepolia ETH (SETH)",
-        fontsize=GAS_COSTS_LABEL_SIZE,
-        labelpad=X_PAD,
-    )
-    ax.set_xticks(x)
-    ax.set_xticklabels(xlabels, fontsize=GAS_COSTS_LABEL_SIZE)
-
-    ax.tick_params(
-        axis="both",
-        labelsize=GAS_COSTS_LABEL_SIZE,
-        pad=Y_PAD,
+    # data: x label -> gas costs in wei of every layer, usd_data: the same in
+    # USD, converted at ETH_TO_USD if None; trimmed_data and trimmed_usd_data:
+    # the same without outliers
+    ether_data = {key: wei_to_eth(np.asarray(values)) for key, values in data.items()}
+    if usd_data is None:
+        usd_data = {key: eth_to_usd(values) for key, values in ether_data.items()}
+    trimmed_ether_data = None
+    if trimmed_data is not None:
+        trimmed_ether_data = {
+            key: wei_to_eth(np.asarray(values)) for key, values in trimmed_data.items()
+        }
+        if trimmed_usd_data is None:
+            trimmed_usd_data = {
+                key: eth_to_usd(values) for key, values in trimmed_ether_data.items()
+            }
+    rate = effective_rate(
+        [np.sum(values) for values in ether_data.values()],
+        [np.sum(values) for values in usd_data.values()],
     )
-    secax.tick_params(
-        axis="both",
-        which="major",
-        labelsize=GAS_COSTS_LABEL_SIZE,
-        pad=Y_PAD,
-    )
-
-    handles, labels = ax.get_legend_handles_labels()
-
-    if show_legend_inside_chart:
-        ax.legend(
-            reversed(handles),
-            reversed(labels),
-            ncol=1,
-            fontsize=GAS_COSTS_LABEL_SIZE,
-        )
-    else:
-        ax.legend(
-            reversed(handles),
-            reversed(labels),
-            loc="upper center",
-            bbox_to_anchor=(0.5, -0.075),
-            fontsize=GAS_COSTS_LABEL_SIZE,
-        )
 
-    plt.tight_layout()
-    plt.savefig(
-        os.path.join(OUTPUT_PATH, output_filename),
-        bbox_inches="tight",
+    plot_stacked_bar_chart(
+        ether_data,
+        labels,
+        title,
+        xlabels,
+        output_filename,
+        y_label="Sepolia ETH (SETH)",
+        format_values=format_gas_costs,
+        label_size=GAS_COSTS_LABEL_SIZE,
+        title_size=GAS_COSTS_TITLE_SIZE,
+        total_prefix="Total:\n",
+        headroom=1.2,
+        secondary_data=usd_data,
+        secondary_axis=("USD", *rate_functions(rate)),
+        show_legend_inside_chart=show_legend_inside_chart,
+        legend_offset=-0.075,
+        trimmed_data=trimmed_ether_data,
+        trimmed_secondary_data=trimmed_usd_data,
+        trimmed_prefix="Trimmed:\n",
     )
-    plt.close()
 
 
 def plot_contracts_gas_costs(registry_configs):
@@ -217,8 +209,7 @@ def plot_contracts_gas_costs(registry_configs):
         titles.append(title)
 
         for operation in operation_gas_costs.keys():
-            gas_costs = [item["gasCostsInWei"] for item in entry["data"][operation]]
-            mean_gas_costs = np.mean(gas_costs) if gas_costs else 0
+            mean_gas_costs = column_mean(entry["data"][operation], "gasCostsInWei")
             operation_gas_costs[operation].append(mean_gas_costs)
 
     # Creating the correct data structure
@@ -242,12 +233,31 @@ def plot_contracts_gas_costs(registry_configs):
     )
 
 
+def plot_function_calls_gas_costs(calls, xlabels, title, output_filename):
+    data, labels, actions = function_call_means(calls, xlabels, "gasCostsInWei")
+    usd_data, _, _ = function_call_means(calls, xlabels, "gasCostsInUsd")
+
+    _plot_stacked_bar_chart(
+        data,
+        labels,
+        title,
+        actions,
+        output_filename,
+        usd_data,
+    )
+
+
 def plot_passport_types_operation_gas_costs(
     data,
     labels,
     title,
     output_filename,
+    usd_data=None,
+    trimmed_data=None,
+    trimmed_usd_data=None,
 ):
+    # trimmed_data and trimmed_usd_data: data and usd_data with the means
+    # without outliers
     xlabels = list(data.keys())
 
     _plot_stacked_bar_chart(
@@ -256,11 +266,24 @@ def plot_passport_types_operation_gas_costs(
         title,
         xlabels,
         output_filename,
+        usd_data,
+        trimmed_data=trimmed_data,
+        trimmed_usd_data=trimmed_usd_data,
     )
 
 
-def plot_passport_types_gas_costs(gas_costs_data):
-    labels = gas_costs_data[0]["data"].keys()
+def plot_passport_types_gas_costs(
+    gas_costs_data,
+    output_filename="gas_costs_passport_types.png",
+    costs_usd_data=None,
+    trimmed_gas_costs_data=None,
+    trimmed_costs_usd_data=None,
+):
+    # costs_usd_data: the gas_costs_data in USD, converted at ETH_TO_USD if
+    # None; trimmed_gas_costs_data and trimmed_costs_usd_data: the same with
+    # the means without outliers, marked on the bars and labelled in
+    # parentheses
+    labels = list(gas_costs_data[0]["data"].keys())
 
     to_exclude = ["Deployment", "Reading"]
     operations = [
@@ -269,43 +292,46 @@ def plot_passport_types_gas_costs(gas_costs_data):
         if entry["operation"] not in to_exclude
     ]
 
-    data_dict = {label: {operation: [] for operation in operations} for label in labels}
-    for entry in gas_costs_data:
-        operation = entry["operation"]
-        for label in labels:
-            data_dict[label][operation] = entry["data"][label]
-
     x = np.arange(len(labels))
     width = 0.2
 
-    fig, ax = plt.subplots(figsize=(16, 8))
-
-    max_height = 0
-    for i, operation in enumerate(operations):
-        y = [np.sum(data_dict[label][operation]) for label in labels]
-        y = [wei_to_eth(wei_value) for wei_value in y]
-        bars = ax.bar(x + i * width, y, width, label=operation)
-
-        for bar in bars:
-            height = bar.get_height()
-
-            usd = eth_to_usd(height)
-
-            ax.annotate(
-                f"{usd:.2f}",
-                xy=(bar.get_x() + bar.get_width() / 2, height),
-                xytext=(0, 2),
-                textcoords="offset points",
-                ha="center",
-                va="bottom",
-                fontsize=GAS_COSTS_LABEL_SIZE,
-            )
-
-            max_height = max(max_height, height)
-
-    ax.set_ylim(0, max_height * 1.15)
+    fig, ax = new_subplots()
+
+    def ether_and_usd(operation_data, usd_operation_data):
+        # (operation, passport type) matrices of the bar heights and their USD
+        ether = wei_to_eth(operation_sums(operation_data, labels, to_exclude))
+        if not usd_operation_data:
+            return ether, eth_to_usd(ether)
+        return ether, operation_sums(usd_operation_data, labels, to_exclude)
+
+    heights, heights_usd = ether_and_usd(gas_costs_data, costs_usd_data)
+    bar_x = x + width * np.arange(len(operations))[:, np.newaxis]
+    for operation, operation_x, y in zip(operations, bar_x, heights):
+        ax.bar(operation_x, y, width, label=operation)
+
+    # labels go above the bar or its trimmed mark, whichever is higher
+    label_heights = heights
+    texts = np.char.mod("%.2f", heights_usd)
+    if trimmed_gas_costs_data is not None:
+        trimmed_heights, trimmed_heights_usd = ether_and_usd(
+            trimmed_gas_costs_data, trimmed_costs_usd_data
+        )
+        plot_trimmed_marks(ax, bar_x, trimmed_heights, width)
+        label_heights = np.maximum(heights, trimmed_heights)
+        texts = with_trimmed(texts, np.char.mod("%.2f", trimmed_heights_usd))
+
+    ax.set_ylim(0, label_heights.max(initial=0) * 1.15 or 1)
+    plot_grouped_bar_labels(
+        ax,
+        bar_x,
+        label_heights,
+        texts,
+        GAS_COSTS_LABEL_SIZE,
+    )
 
-    secax = ax.secondary_yaxis("right", functions=(eth_to_usd, usd_to_eth))
+    secax = ax.secondary_yaxis(
+        "right", functions=rate_functions(effective_rate(heights, heights_usd))
+    )
     secax.set_ylabel(
         "USD",
         fontsize=GAS_COSTS_LABEL_SIZE,
@@ -347,7 +373,6 @@ def plot_passport_types_gas_costs(gas_costs_data):
     )
 
     plt.savefig(
-        os.path.join(OUTPUT_PATH, "gas_costs_passport_types.png"),
+        os.path.join(OUTPUT_PATH, output_filename),
         bbox_inches="tight",
     )
-    plt.close()
@@ -4,9 +4,10 @@ import matplotlib.pyplot as plt
 import numpy as np
 import seaborn as sns
 from matplotlib.colors import LinearSegmentedColormap
+from utils.figures import new_figure, new_subplots
+from utils.outliers import outlier_flags
 
 OUTPUT_PATH = "plots"
-os.makedirs(OUTPUT_PATH, exist_ok=True)
 
 GAS_COSTS_LABEL_SIZE = 20
 GAS_COSTS_TITLE_SIZE = 22
@@ -15,58 +16,54 @@ PERFORMANCE_TITLE_SIZE = 20
 X_PAD = 10
 Y_PAD = 5
 
-DELIMITER = "*"
-
 SHOW_TITLE = False
 
-ETH_CONVERSION = 1e18
-# mainnet price on 2024-06-14 24:00 coingecko
-ETH_TO_USD = 3465.32
-
-
-def eth_to_usd(y):
-    return y * ETH_TO_USD
-
-
-def usd_to_eth(y):
-    return y / ETH_TO_USD
+# line height of bar labels as a multiple of their font size; labels of one bar
+# are kept at least this far apart
+LABEL_LINE_HEIGHT = 1.3
+# legends of stacked bars with more layers get further columns
+LEGEND_MAX_ROWS = 12
+# gap between a bar and its total, as a fraction of the highest bar
+TOTAL_GAP = 0.007
+# width of the bars of stacked bar charts
+BAR_WIDTH = 0.8
+# legend entry of the dashed marks at the values without outliers
+TRIMMED_LABEL = "Trimmed Mean"
 
 
-def wei_to_eth(y):
-    return y / ETH_CONVERSION
-
+def row_normalize(numeric_data):
+    # row-wise min-max normalization; blank rows and rows without spread are
+    # neutral (0.5)
+    mask = np.isnan(numeric_data)
+    min_val = np.where(mask, np.inf, numeric_data).min(axis=1, keepdims=True)
+    max_val = np.where(mask, -np.inf, numeric_data).max(axis=1, keepdims=True)
+    value_range = max_val - min_val
+    normalized_data = np.full(numeric_data.shape, 0.5)
+    np.divide(
+        numeric_data - min_val,
+        value_range,
+        out=normalized_data,
+        where=~mask & np.isfinite(value_range) & (value_range != 0),
+    )
+    return normalized_data
 
-def plot_heatmap(data, numeric_data, x_labels, y_labels, output_filename):
-    normalized_data = np.zeros_like(numeric_data, dtype=float)
-    for i in range(numeric_data.shape[0]):
-        min_val = np.nanmin(numeric_data[i])
-        max_val = np.nanmax(numeric_data[i])
-        if min_val != max_val:
-            normalized_data[i] = (numeric_data[i] - min_val) / (max_val - min_val)
-        else:
-            normalized_data[i] = 0.5
-        # Set NaN values to neutral (0.5) for the blank rows
-        normalized_data[i] = np.where(
-            np.isnan(numeric_data[i]), 0.5, normalized_data[i]
-        )
 
+def plot_heatmap(annotations, numeric_data, x_labels, y_labels, output_filename):
     mask = np.isnan(numeric_data)
+    normalized_data = row_normalize(numeric_data)
 
     cmap = LinearSegmentedColormap.from_list(
         "relative_coloring", ["red", "yellow", "green"]
     )
 
-    plt.figure(figsize=(16, len(y_labels)))
+    new_figure(figsize=(16, len(y_labels)))
     ax = sns.heatmap(
         normalized_data,
         xticklabels=x_labels,
         yticklabels=y_labels,
         cmap=cmap,
         cbar=True,
-        annot=[
-            [cell.split(DELIMITER)[1] if DELIMITER in cell else cell for cell in row]
-            for row in data
-        ],
+        annot=annotations,
         fmt="",
         annot_kws={"size": PERFORMANCE_LABEL_SIZE},
         mask=mask,
@@ -94,4 +91,319 @@ def plot_heatmap(data, numeric_data, x_labels, y_labels, output_filename):
         os.path.join(OUTPUT_PATH, output_filename),
         bbox_inches="tight",
     )
-    plt.close()
+
+
+def stack_layers(values):
+    # values: (layer, bar) matrix; bottoms and tops of every segment
+    tops = np.cumsum(values, axis=0)
+    return tops - values, tops
+
+
+def spread_labels(positions, shown, min_distance):
+    # moves the shown labels of every bar (a column of positions, ascending)
+    # upwards until consecutive ones are at least min_distance apart:
+    # y_i = max(p_i, y_(i-1) + d) is max over k <= i of p_k + (i - k) d
+    rank = np.cumsum(shown, axis=0) - 1
+    offsets = rank * min_distance
+    return (
+        np.maximum.accumulate(
+            np.where(shown, positions - offsets, -np.inf),
+            axis=0,
+        )
+        + offsets
+    )
+
+
+def _line_height(ax, fontsize):
+    # height of one text line in data units of the y-axis
+    y_min, y_max = ax.get_ylim()
+    pixels = fontsize * LABEL_LINE_HEIGHT * ax.figure.dpi / 72
+    return pixels * (y_max - y_min) / ax.get_window_extent().height
+
+
+def _data_widths(ax, texts):
+    # widths of drawn texts in data units of the x-axis
+    renderer = ax.figure.canvas.get_renderer()
+    to_data = ax.transData.inverted()
+    return np.array(
+        [
+            np.diff(to_data.transform(text.get_window_extent(renderer))[:, 0])[0]
+            for text in texts
+        ]
+    )
+
+
+def operation_sums(operation_data, groups, excluded=()):
+    # (operation, group) matrix of the summed steps of evaluate_passport_types
+    # output, without the excluded operations
+    return np.array(
+        [
+            [np.sum(entry["data"][group]) for group in groups]
+            for entry in operation_data
+            if entry["operation"] not in excluded
+        ],
+        dtype=np.float64,
+    )
+
+
+def plot_trimmed_marks(ax, x, heights, width, label=TRIMMED_LABEL):
+    # a dashed line across every bar at its value without outliers
+    x = np.ravel(x)
+    ax.hlines(
+        np.ravel(heights),
+        x - width / 2,
+        x + width / 2,
+        colors="black",
+        linestyles="--",
+        linewidth=2,
+        zorder=3,
+        label=label,
+    )
+
+
+def duration_legend(data, duration, unit, outliers=None):
+    # legend text of the durations of a series of runs and the outlier flags
+    # of the runs, None without outliers
+    if not outliers:
+        return f"Mean: {duration.mean():.2f} {unit}", None
+    flags = outlier_flags(data["durationInMs"], outliers)
+    trimmed_mean = duration[~flags].mean()
+    return (
+        f"Mean: {duration.mean():.2f}, Trimmed Mean: {trimmed_mean:.2f} {unit}",
+        flags,
+    )
+
+
+def gas_costs_legend(data, gas_costs_in_ether, gas_costs_in_usd, unit, outliers=None):
+    # legend text of the gas costs of a series of runs and the outlier flags
+    # of the runs, None without outliers
+    legend = (
+        f"Mean: {gas_costs_in_ether.mean():.6f} {unit} / "
+        f"{gas_costs_in_usd.mean():.2f} USD"
+    )
+    if not outliers:
+        return legend, None
+    flags = outlier_flags(data["gasCostsInWei"], outliers)
+    trimmed_legend = (
+        f"Trimmed Mean: {gas_costs_in_ether[~flags].mean():.6f} {unit} / "
+        f"{gas_costs_in_usd[~flags].mean():.2f} USD"
+    )
+    return f"{legend}, {trimmed_legend}", flags
+
+
+def with_trimmed(texts, trimmed_texts):
+    # "<value> (<trimmed value>)"
+    return np.char.add(np.char.add(np.char.add(texts, " ("), trimmed_texts), ")")
+
+
+def plot_grouped_bar_labels(ax, x, heights, texts, fontsize):
+    # labels above the bars of a grouped bar chart; x, heights and texts are
+    # (bar, group) matrices. A label that would overlap a label of a bar to its
+    # left is moved a line above it, for all groups at once.
+    line_height = _line_height(ax, fontsize)
+    label_y = heights + TOTAL_GAP * heights.max(initial=0) + line_height / 2
+    labels = [
+        ax.text(
+            x[i, j],
+            label_y[i, j],
+            texts[i, j],
+            ha="center",
+            va="center",
+            fontsize=fontsize,
+        )
+        for i, j in np.ndindex(heights.shape)
+    ]
+    widths = _data_widths(ax, labels).reshape(heights.shape)
+
+    for i in range(1, len(label_y)):
+        # every move clears at least one of the i labels to the left
+        for _ in range(i):
+            collides = (x[i] - x[:i] < (widths[i] + widths[:i]) / 2) & (
+                np.abs(label_y[i] - label_y[:i]) < line_height
+            )
+            if not collides.any():
+                break
+            label_y[i] = np.where(
+                collides.any(axis=0),
+                np.where(collides, label_y[:i], -np.inf).max(axis=0) + line_height,
+                label_y[i],
+            )
+    for label, y in zip(labels, label_y.ravel()):
+        label.set_y(y)
+
+    # labels moved above the headroom get more space
+    top = label_y.max(initial=0) + line_height / 2
+    if top > ax.get_ylim()[1]:
+        ax.set_ylim(0, top)
+
+
+def plot_stacked_bar_chart(
+    data,
+    labels,
+    title,
+    xlabels,
+    output_filename,
+    y_label,
+    format_values,
+    label_size=PERFORMANCE_LABEL_SIZE,
+    title_size=PERFORMANCE_TITLE_SIZE,
+    total_prefix="Total: ",
+    headroom=1.15,
+    secondary_data=None,
+    secondary_axis=None,
+    show_legend_inside_chart=False,
+    legend_offset=-0.065,
+    trimmed_data=None,
+    trimmed_secondary_data=None,
+    trimmed_prefix="Trimmed: ",
+):
+    # data: x label -> value of every layer; format_values: array of values ->
+    # array of label texts; secondary_data: same layout as data, e.g. the values
+    # in another currency, passed to format_values as a second array;
+    # secondary_axis: (label, forward, inverse) or None; trimmed_data and
+    # trimmed_secondary_data: data and secondary_data without outliers, their
+    # totals are marked on every bar and labelled below the totals
+
+    def layers(layer_data):
+        return np.array([layer_data[key] for key in xlabels], dtype=np.float64).T
+
+    values = layers(data)
+    x = np.arange(len(xlabels))
+    bottoms, tops = stack_layers(values)
+    totals = values.sum(axis=0)
+
+    fig, ax = new_subplots()
+    for label, layer_values, layer_bottoms in zip(labels, values, bottoms):
+        ax.bar(x, layer_values, BAR_WIDTH, bottom=layer_bottoms, label=label)
+
+    max_height = totals.max(initial=0)
+    if trimmed_data is not None:
+        trimmed_totals = layers(trimmed_data).sum(axis=0)
+        plot_trimmed_marks(ax, x, trimmed_totals, BAR_WIDTH)
+        max_height = max(max_height, trimmed_totals.max(initial=0))
+    ax.set_ylim(0, max_height * headroom or 1)
+
+    # segment labels start centred in their segment, at least half a line above
+    # the axis, and are spread apart where thin segments would make them overlap
+    shown = values != 0
+    line_height = _line_height(ax, label_size)
+    centers = np.maximum(bottoms + values / 2, line_height / 2)
+    label_y = spread_labels(centers, shown, line_height)
+    # labels pushed above their bar are left out and the rest spread again,
+    # so bars with many thin segments keep readable labels
+    shown &= label_y <= totals + line_height / 2
+    label_y = spread_labels(centers, shown, line_height)
+    if secondary_data is None:
+        texts = format_values(values)
+        total_texts = format_values(totals)
+    else:
+        secondary_values = layers(secondary_data)
+        texts = format_values(values, secondary_values)
+        total_texts = format_values(totals, secondary_values.sum(axis=0))
+    for i, j in zip(*np.nonzero(shown)):
+        ax.text(
+            x[j],
+            label_y[i, j],
+            texts[i, j],
+            ha="center",
+            va="center",
+            fontsize=label_size,
+        )
+
+    # totals of bars with more than one segment, above the bar and its labels
+    total_texts = np.char.add(total_prefix, total_texts)
+    show_totals = (values > 0).sum(axis=0) > 1
+    highest_label = np.where(shown, label_y, -np.inf).max(axis=0, initial=-np.inf)
+    total_y = np.maximum(
+        tops[-1] + TOTAL_GAP * max_height if len(values) else totals,
+        highest_label + line_height / 2,
+    )
+    if trimmed_data is not None:
+        # the trimmed total of every bar, below its total if it has one
+        if secondary_data is None:
+            trimmed_texts = format_values(trimmed_totals)
+        else:
+            trimmed_texts = format_values(
+                trimmed_totals, layers(trimmed_secondary_data).sum(axis=0)
+            )
+        total_texts = np.char.add(
+            np.where(show_totals, np.char.add(total_texts, "\n"), ""),
+            np.char.add(trimmed_prefix, trimmed_texts),
+        )
+        show_totals = totals > 0
+        total_y = np.maximum(total_y, trimmed_totals + TOTAL_GAP * max_height)
+    top = highest_label.max(initial=0) + line_height / 2
+    for j in np.flatnonzero(show_totals):
+        ax.text(
+            x[j],
+            total_y[j],
+            total_texts[j],
+            ha="center",
+            va="bottom",
+            fontsize=label_size,
+            color="black",
+        )
+        lines = total_texts[j].count("\n") + 1
+        top = max(top, total_y[j] + lines * line_height)
+
+    # labels moved above the headroom get more space
+    if top > ax.get_ylim()[1]:
+        ax.set_ylim(0, top)
+
+    if secondary_axis:
+        secondary_label, forward, inverse = secondary_axis
+        secax = ax.secondary_yaxis("right", functions=(forward, inverse))
+        secax.set_ylabel(
+            secondary_label,
+            fontsize=label_size,
+            labelpad=X_PAD,
+        )
+        secax.tick_params(
+            axis="both",
+            which="major",
+            labelsize=label_size,
+            pad=Y_PAD,
+        )
+
+    if SHOW_TITLE:
+        ax.set_title(
+            title,
+            fontsize=title_size,
+            pad=X_PAD,
+        )
+    ax.set_ylabel(
+        y_label,
+        fontsize=label_size,
+        labelpad=X_PAD,
+    )
+    ax.set_xticks(x)
+    ax.set_xticklabels(xlabels, fontsize=label_size)
+    ax.tick_params(
+        axis="both",
+        labelsize=label_size,
+        pad=Y_PAD,
+    )
+
+    handles, labels = ax.get_legend_handles_labels()
+
+    if show_legend_inside_chart:
+        ax.legend(
+            reversed(handles),
+            reversed(labels),
+            ncol=1,
+            fontsize=label_size,
+        )
+    else:
+        ax.legend(
+            reversed(handles),
+            reversed(labels),
+            loc="upper center",
+            bbox_to_anchor=(0.5, legend_offset),
+            ncol=-(-len(labels) // LEGEND_MAX_ROWS),
+            fontsize=label_size,
+        )
+
+    plt.savefig(
+        os.path.join(OUTPUT_PATH, output_filename),
+        bbox_inches="tight",
+    )
@@ -0,0 +1,127 @@
+import json
+import os
+import re
+import textwrap
+from itertools import zip_longest
+
+from utils.preprocessing import (
+    LOG_EXTENSION,
+    iter_chain_records,
+    iter_log_records,
+    load_json,
+)
+from utils.store import ACTIONS
+
+SNIFF_SIZE = 64 * 1024
+
+
+def _first_json_key(file_path):
+    with open(file_path, "r") as f:
+        match = re.match(r'\s*\{\s*"((?:[^"\\]|\\.)*)"', f.read(SNIFF_SIZE))
+    return json.loads(f'"{match.group(1)}"') if match else None
+
+
+def _first_log_record(file_path):
+    for record, _ in iter_log_records(file_path):
+        return record
+    return None
+
+
+def is_registry_json(file_path):
+    # registry files are keyed by chain id, Arweave.json by action
+    return _first_json_key(file_path) not in ACTIONS
+
+
+def is_registry_log(file_path):
+    record = _first_log_record(file_path)
+    return record is not None and "chain" in record
+
+
+def _write_line(f, record):
+    f.write(json.dumps(record, separators=(",", ":")))
+    f.write("\n")
+
+
+def json_to_log(json_path, log_path):
+    # one line per run; the runs of Arweave.json are the records at the same
+    # position of every action
+    with open(log_path, "w") as f:
+        if is_registry_json(json_path):
+            for chain_id, record in iter_chain_records(json_path):
+                _write_line(f, {"chain": chain_id, **record})
+        else:
+            measurements = load_json(json_path)
+            for items in zip_longest(*measurements.values()):
+                _write_line(
+                    f,
+                    {
+                        action: [item]
+                        for action, item in zip(measurements, items)
+                        if item is not None
+                    },
+                )
+
+
+def _write_json_list(f, key, items, last):
+    # the indentation of JSON.stringify(value, null, 2) in the measurement scripts
+    f.write(f"  {json.dumps(key)}: [")
+    empty = True
+    for item in items:
+        f.write("\n" if empty else ",\n")
+        f.write(textwrap.indent(json.dumps(item, indent=2), "    "))
+        empty = False
+    f.write("]" if empty else "\n  ]")
+    f.write("\n" if last else ",\n")
+
+
+def log_to_json(log_path, json_path):
+    # the layout of data/contracts/*.json or data/Arweave.json; the log is read
+    # once per chain or action, so it is never held in memory as a whole
+    registry = is_registry_log(log_path)
+    keys = {}
+    for record, _ in iter_log_records(log_path):
+        if registry:
+            keys[record["chain"]] = None
+        else:
+            keys.update(dict.fromkeys(record))
+
+    with open(json_path, "w") as f:
+        f.write("{\n")
+        for i, key in enumerate(keys):
+            if registry:
+                items = (
+                    {
+                        action: steps
+                        for action, steps in record.items()
+                        if action != "chain"
+                    }
+                    for record, _ in iter_log_records(log_path)
+                    if record["chain"] == key
+                )
+            else:
+                items = (
+                    item
+                    for record, _ in iter_log_records(log_path)
+                    for item in record.get(key, [])
+                )
+            _write_json_list(f, key, items, last=not registry and i == len(keys) - 1)
+        if registry:
+            # registry files end with the contract, named like the log
+            contract_name = os.path.basename(log_path)[: -len(LOG_EXTENSION)]
+            f.write(f'  "contractName": {json.dumps(contract_name)}\n')
+        f.write("}")
+
+
+def convert(source_path, target_path):
+    # the direction follows from the extensions
+    if source_path.endswith(LOG_EXTENSION) and not target_path.endswith(LOG_EXTENSION):
+        log_to_json(source_path, target_path)
+    elif target_path.endswith(LOG_EXTENSION) and not source_path.endswith(
+        LOG_EXTENSION
+    ):
+        json_to_log(source_path, target_path)
+    else:
+        raise ValueError(
+            f"Convert between a .json file and a {LOG_EXTENSION} log, "
+            f"got {source_path} and {target_path}."
+        )
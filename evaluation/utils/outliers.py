@@ -0,0 +1,50 @@
+import weakref
+
+import numpy as np
+
+OUTLIER_METHODS = ["iqr", "mad"]
+# Tukey fences: outside [q1 - 1.5 IQR, q3 + 1.5 IQR]
+IQR_FACTOR = 1.5
+# Iglewicz and Hoaglin: modified z-score above 3.5
+MAD_THRESHOLD = 3.5
+MAD_SCALE = 0.6745
+# smaller samples are never flagged
+MIN_SAMPLES = 4
+
+# (id of a column, method) -> flags; entries are dropped with their column
+_flag_cache = {}
+
+
+def outlier_mask(values, method="iqr"):
+    # True for every value classified as outlier
+    if method not in OUTLIER_METHODS:
+        raise ValueError(
+            f"Invalid outlier method. Choose one of {', '.join(OUTLIER_METHODS)}."
+        )
+
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < MIN_SAMPLES:
+        return np.zeros(len(values), dtype=bool)
+
+    if method == "iqr":
+        q1, q3 = np.percentile(values, [25, 75])
+        spread = IQR_FACTOR * (q3 - q1)
+        return (values < q1 - spread) | (values > q3 + spread)
+
+    median = np.median(values)
+    deviations = np.abs(values - median)
+    mad = np.median(deviations)
+    if mad == 0:
+        # more than half of the values are equal, nothing stands out
+        return np.zeros(len(values), dtype=bool)
+    return MAD_SCALE * deviations / mad > MAD_THRESHOLD
+
+
+def outlier_flags(values, method="iqr"):
+    # cached outlier_mask of a column; the column itself is never copied, so
+    # every chart and table of one run shares the flags of a column
+    key = (id(values), method)
+    if key not in _flag_cache:
+        _flag_cache[key] = outlier_mask(values, method)
+        weakref.finalize(values, _flag_cache.pop, key, None)
+    return _flag_cache[key]
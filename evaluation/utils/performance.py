@@ -2,7 +2,7 @@ import os
 
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
+from utils.figures import format_time_axis, new_figure, new_subplots
 from utils.helpers import (
     OUTPUT_PATH,
     PERFORMANCE_LABEL_SIZE,
@@ -10,9 +10,16 @@ from utils.helpers import (
     SHOW_TITLE,
     X_PAD,
     Y_PAD,
+    duration_legend,
+    operation_sums,
+    plot_grouped_bar_labels,
+    plot_stacked_bar_chart,
+    plot_trimmed_marks,
+    with_trimmed,
 )
-
-plt.rcParams["font.family"] = "Arial"
+from utils.preprocessing import function_call_means
+from utils.store import column_mean, local_start_times
+from utils.timeseries import MAX_MARKERS, MAX_POINTS, prepare_series
 
 
 def plot_performance(
@@ -22,42 +29,57 @@ def plot_performance(
     output_filename,
     x_axis,
     is_arweave=False,
+    interval=None,
+    rolling_window=None,
+    statistic="mean",
+    max_points=MAX_POINTS,
+    outliers=None,
+    network="Sepolia",
 ):
+    # network: the chain of the runs, None for a comparison of several chains
 
     # Validate x_axis input
     if x_axis not in ["ms", "s"]:
         raise ValueError("Invalid x_axis value. Choose 'ms' or 's'.")
 
-    plt.figure(figsize=(16, 8))
+    new_figure()
 
     for _, (data, label) in enumerate(zip(data_list, labels)):
-        df = pd.DataFrame(data)
-
-        df["startTimestamp"] = (
-            pd.to_datetime(df["startTimestamp"], unit="ms")
-            .dt.tz_localize("UTC")
-            .dt.tz_convert("Europe/Zurich")
-        )
-        # Round down to the nearest 5 minutes
-        df["formattedTimestamp"] = (
-            df["startTimestamp"].dt.floor("5min").dt.strftime("%H:%M")
-        )
-
         # Convert duration based on x_axis
         if x_axis == "s":
-            df["duration"] = df["durationInMs"] / 1000
+            duration = data["durationInMs"] / 1000
         else:
-            df["duration"] = df["durationInMs"]
+            duration = data["durationInMs"]
 
-        mean_duration = df["duration"].mean()
         unit = "Seconds" if x_axis == "s" else "Milliseconds"
+        legend, flags = duration_legend(data, duration, unit, outliers)
+
+        times, values = prepare_series(
+            local_start_times(data),
+            duration,
+            interval,
+            rolling_window,
+            statistic,
+            max_points,
+        )
 
-        plt.plot(
-            df["formattedTimestamp"],
-            df["duration"],
-            label=f"{label} (Mean: {mean_duration:.2f} {unit})",
-            marker="o",
+        (line,) = plt.plot(
+            times,
+            values,
+            label=f"{label} ({legend})",
+            marker="o" if len(values) <= MAX_MARKERS else None,
         )
+        if outliers:
+            # the flagged runs are crossed out on top of the series
+            plt.scatter(
+                local_start_times(data).to_numpy()[flags],
+                duration[flags],
+                marker="x",
+                s=150,
+                color=line.get_color(),
+                zorder=3,
+            )
+    format_time_axis(plt.gca())
     if SHOW_TITLE:
         plt.title(
             title,
@@ -65,7 +87,7 @@ def plot_performance(
             pad=X_PAD,
         )
     plt.xlabel(
-        f'Execution Time {"on Sepolia " if not is_arweave else ""}(2024-06-14 HH:MM CEST)',
+        f'Execution Time {f"on {network} " if network and not is_arweave else ""}(CEST)',
         fontsize=PERFORMANCE_LABEL_SIZE,
         labelpad=X_PAD,
     )
@@ -93,7 +115,10 @@ def plot_performance(
         os.path.join(OUTPUT_PATH, output_filename),
         bbox_inches="tight",
     )
-    plt.close()
+
+
+def format_durations(values):
+    return np.char.mod("%.2f", values)
 
 
 def _plot_stacked_bar_chart(
@@ -103,99 +128,21 @@ def _plot_stacked_bar_chart(
     xlabels,
     output_filename,
     show_legend_inside_chart=False,
+    trimmed_data=None,
 ):
-    fig, ax = plt.subplots(figsize=(16, 8))
-
-    x = range(len(xlabels))
-    bottoms = np.zeros(len(xlabels))
-
-    for i, label in enumerate(labels):
-        values = [data[key][i] for key in xlabels]
-        bars = ax.bar(x, values, bottom=bottoms, label=label)
-        for j, bar in enumerate(bars):
-            height = bar.get_height()
-
-            adjustment = 0
-            if round(height, 2) == 0.33:
-                adjustment = 0.3
-
-            if height != 0:
-                ax.text(
-                    bar.get_x() + bar.get_width() / 2,
-                    bottoms[j] + height / 2 + adjustment,
-                    f"{height:.2f}",
-                    ha="center",
-                    va="center",
-                    fontsize=PERFORMANCE_LABEL_SIZE,
-                )
-
-            bottoms[j] += height
-
-    total_durations = {key: sum(data[key]) for key in xlabels}
-    for i, (key, total) in enumerate(total_durations.items()):
-        data_count = sum(1 for value in data[key] if value > 0)
-
-        if data_count > 1:
-
-            adjustment = 0
-            if round(data[key][-1], 2) == 0:
-                adjustment = 0.8
-
-            ax.text(
-                x[i],
-                bottoms[i] + 0.007 * max(bottoms) + adjustment,
-                f"Total: {total:.2f}",
-                ha="center",
-                va="bottom",
-                fontsize=PERFORMANCE_LABEL_SIZE,
-                color="black",
-            )
-
-    max_height = max(bottoms)
-    ax.set_ylim(0, max_height * 1.15)
-
-    if SHOW_TITLE:
-        ax.set_title(
-            title,
-            fontsize=PERFORMANCE_TITLE_SIZE,
-            pad=X_PAD,
-        )
-    ax.set_ylabel(
-        "Duration (Seconds)",
-        fontsize=PERFORMANCE_LABEL_SIZE,
-        labelpad=X_PAD,
-    )
-    ax.set_xticks(x)
-    ax.set_xticklabels(xlabels, fontsize=PERFORMANCE_LABEL_SIZE)
-    ax.tick_params(
-        axis="both",
-        labelsize=PERFORMANCE_LABEL_SIZE,
-        pad=Y_PAD,
-    )
-
-    handles, labels = ax.get_legend_handles_labels()
-
-    if show_legend_inside_chart:
-        ax.legend(
-            reversed(handles),
-            reversed(labels),
-            ncol=1,
-            fontsize=PERFORMANCE_LABEL_SIZE,
-        )
-    else:
-        ax.legend(
-            reversed(handles),
-            reversed(labels),
-            loc="upper center",
-            bbox_to_anchor=(0.5, -0.065),
-            fontsize=PERFORMANCE_LABEL_SIZE,
-        )
-
-    plt.savefig(
-        os.path.join(OUTPUT_PATH, output_filename),
-        bbox_inches="tight",
+    plot_stacked_bar_chart(
+        data,
+        labels,
+        title,
+        xlabels,
+        output_filename,
+        y_label="Duration (Seconds)",
+        format_values=format_durations,
+        label_size=PERFORMANCE_LABEL_SIZE,
+        title_size=PERFORMANCE_TITLE_SIZE,
+        show_legend_inside_chart=show_legend_inside_chart,
+        trimmed_data=trimmed_data,
     )
-    plt.close()
 
 
 def plot_contracts_performance(registry_configs):
@@ -213,8 +160,7 @@ def plot_contracts_performance(registry_configs):
         titles.append(title)
 
         for operation in operation_performance.keys():
-            durations = [item["durationInMs"] for item in entry["data"][operation]]
-            mean_duration = np.mean(durations) / 1000 if durations else 0
+            mean_duration = column_mean(entry["data"][operation], "durationInMs") / 1000
             operation_performance[operation].append(mean_duration)
 
     data = {title: [] for title in titles}
@@ -237,19 +183,41 @@ def plot_contracts_performance(registry_configs):
     )
 
 
+def plot_function_calls_performance(calls, xlabels, title, output_filename):
+    data, labels, xlabels = function_call_means(calls, xlabels, "durationInMs", 1000)
+
+    _plot_stacked_bar_chart(
+        data,
+        labels,
+        title,
+        xlabels,
+        output_filename,
+    )
+
+
 def plot_passport_types_operation_performance(
     data,
     labels,
     title,
     output_filename,
+    trimmed_data=None,
 ):
+    # trimmed_data: data with the means without outliers
     xlabels = list(data.keys())
 
-    _plot_stacked_bar_chart(data, labels, title, xlabels, output_filename)
+    _plot_stacked_bar_chart(
+        data, labels, title, xlabels, output_filename, trimmed_data=trimmed_data
+    )
 
 
-def plot_passport_types_performance(performance_data):
-    labels = performance_data[0]["data"].keys()
+def plot_passport_types_performance(
+    performance_data,
+    output_filename="performance_passport_types.png",
+    trimmed_performance_data=None,
+):
+    # trimmed_performance_data: performance_data with the means without
+    # outliers, marked on the bars and labelled in parentheses
+    labels = list(performance_data[0]["data"].keys())
 
     to_exclude = ["Deployment"]
     operations = [
@@ -258,44 +226,28 @@ def plot_passport_types_performance(performance_data):
         if entry["operation"] not in to_exclude
     ]
 
-    data_dict = {label: {operation: [] for operation in operations} for label in labels}
-    for entry in performance_data:
-        operation = entry["operation"]
-        for label in labels:
-            data_dict[label][operation] = entry["data"][label]
-
     x = np.arange(len(labels))
     width = 0.18
 
-    fig, ax = plt.subplots(figsize=(16, 8))
-
-    max_height = 0
-    for i, operation in enumerate(operations):
-        y = [np.sum(data_dict[label][operation]) for label in labels]
-        bars = ax.bar(x + i * width, y, width, label=operation)
-
-        adjustment = 0
-        if i == 2:
-            adjustment = -2
-        if i == 3:
-            adjustment = 2
-
-        for bar in bars:
-            height = bar.get_height()
-
-            ax.annotate(
-                f"{height:.2f}",
-                xy=(bar.get_x() + bar.get_width() / 2, height),
-                xytext=(0 + adjustment, 2),
-                textcoords="offset points",
-                ha="center",
-                va="bottom",
-                fontsize=PERFORMANCE_LABEL_SIZE,
-            )
+    fig, ax = new_subplots()
+
+    # (operation, passport type) matrix of the bar heights
+    heights = operation_sums(performance_data, labels, to_exclude)
+    bar_x = x + width * np.arange(len(operations))[:, np.newaxis]
+    for operation, operation_x, y in zip(operations, bar_x, heights):
+        ax.bar(operation_x, y, width, label=operation)
 
-            max_height = max(max_height, height)
+    # labels go above the bar or its trimmed mark, whichever is higher
+    label_heights = heights
+    texts = format_durations(heights)
+    if trimmed_performance_data is not None:
+        trimmed_heights = operation_sums(trimmed_performance_data, labels, to_exclude)
+        plot_trimmed_marks(ax, bar_x, trimmed_heights, width)
+        label_heights = np.maximum(heights, trimmed_heights)
+        texts = with_trimmed(texts, format_durations(trimmed_heights))
 
-    ax.set_ylim(0, max_height * 1.1)
+    ax.set_ylim(0, label_heights.max(initial=0) * 1.1 or 1)
+    plot_grouped_bar_labels(ax, bar_x, label_heights, texts, PERFORMANCE_LABEL_SIZE)
 
     ax.set_ylabel(
         "Duration (Seconds)",
@@ -326,7 +278,6 @@ def plot_passport_types_performance(performance_data):
     )
 
     plt.savefig(
-        os.path.join(OUTPUT_PATH, "performance_passport_types.png"),
+        os.path.join(OUTPUT_PATH, output_filename),
         bbox_inches="tight",
     )
-    plt.close()
@@ -1,28 +1,40 @@
 import json
-
-import pandas as pd
-
-
-def compute_duration_mean(data):
-    mean_duration_in_s = {}
-    for key in data.keys():
-        df = pd.DataFrame(data[key])
-        if "durationInMs" not in df.columns:
-            mean_duration_in_s[key] = 0
-            continue
-        mean_duration_in_s[key] = df["durationInMs"].mean() / 1000
-    return mean_duration_in_s
-
-
-def compute_gas_costs_mean(data):
-    mean_gas_costs_in_wei = {}
-    for key in data.keys():
-        df = pd.DataFrame(data[key])
-        if "gasCostsInWei" not in df.columns:
-            mean_gas_costs_in_wei[key] = 0
-            continue
-        mean_gas_costs_in_wei[key] = df["gasCostsInWei"].mean()
-    return mean_gas_costs_in_wei
+import os
+
+import numpy as np
+from utils.cache import cached_load, cached_log_load
+from utils.compositions import (
+    ARWEAVE,
+    DID_REGISTRY,
+    HALO_NFC_METADATA_REGISTRY,
+    NFT_REGISTRY,
+    PBT_REGISTRY,
+    evaluate_passport_types,
+)
+from utils.profiling import profiled
+from utils.store import (
+    ACTIONS,
+    STEP_COLUMNS,
+    add_local_time,
+    aggregate_steps,
+    column_mean,
+    group_by_function,
+    lists_to_columns,
+    records_to_columns,
+)
+
+SEPOLIA_CHAIN_ID = "11155111"
+
+CHAIN_NAMES = {
+    SEPOLIA_CHAIN_ID: "Sepolia",
+}
+
+READ_CHUNK_SIZE = 64 * 1024
+
+# append-only measurement logs hold one run per line
+LOG_EXTENSION = ".jsonl"
+
+_json_decoder = json.JSONDecoder()
 
 
 def load_json(file_path):
@@ -30,362 +42,384 @@ def load_json(file_path):
         return json.load(f)
 
 
-def process_registry_data(data_path):
-    all_registry_data = load_json(data_path)
-
-    registry_actions = {
-        "deployment": [],
-        "create": [],
-        "read": [],
-        "update": [],
-        "delete": [],
+@profiled
+def build_measurements(file_path):
+    return {
+        action: add_local_time(records_to_columns(records))
+        for action, records in load_json(file_path).items()
     }
 
-    for record in all_registry_data["11155111"]:
-        for key in registry_actions.keys():
-            if not record[key]:
+
+@profiled
+def load_measurements(file_path, use_cache=True):
+    if file_path.endswith(LOG_EXTENSION):
+        return _load_log(
+            file_path, _read_measurement_log, _build_log_measurements, use_cache
+        )
+    if use_cache:
+        return cached_load(file_path, build_measurements)
+    return build_measurements(file_path)
+
+
+class _JSONStream:
+    # Minimal incremental JSON reader: it only keeps the unconsumed tail of the
+    # file in memory and decodes one value at a time with raw_decode.
+
+    def __init__(self, f, chunk_size=READ_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def consume(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of {self.f.name}")
+        self.pos += 1
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _json_decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
                 continue
-            elif len(record[key]) == 1:
-                registry_actions[key].extend(record[key])
+            # a number at the very end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and isinstance(value, (int, float)):
+                if self._fill():
+                    continue
+            self.pos = end
+            return value
+
+    def iter_array(self):
+        self.consume("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.decode()
+            if self.peek() != ",":
+                break
+            self.pos += 1
+        self.consume("]")
+
+
+def iter_chain_records(data_path):
+    # yields (chain_id, record) for every chain in the file; top-level values
+    # that are not lists of runs, e.g. "contractName", are skipped
+    with open(data_path, "r") as f:
+        stream = _JSONStream(f)
+        stream.consume("{")
+        while stream.peek() != "}":
+            key = stream.decode()
+            stream.consume(":")
+            if stream.peek() == "[":
+                for record in stream.iter_array():
+                    yield key, record
             else:
-                gas_costs_sum = sum(item["gasCostsInWei"] for item in record[key][1:])
-                duration_sum = sum(item["durationInMs"] for item in record[key][1:])
-                start_timestamp = record[key][0]["startTimestamp"]
-                registry_actions[key].append(
-                    {
-                        "gasCostsInWei": gas_costs_sum,
-                        "durationInMs": duration_sum,
-                        "startTimestamp": start_timestamp,
-                    }
-                )
-
-    return registry_actions
-
-
-deployment_labels = [
-    "1. Sepolia: NFT, PBT, or DID Registry Contract Deployment",
-    "2. Sepolia: HaLo NFC Metadata Registry Contract Deployment",
-]
-
-create_labels = [
-    "1. Arweave: Upload Passport Data",
-    "2. Sepolia: Create Identifier on Registry Contract",
-    "3. Arweave: Upload Passport Metadata",
-    "4. Sepolia: Store MetadataURI on HaLo NFC Metadata Registry Contract",
-]
-
-read_labels = [
-    "1. Sepolia: Read MetadataURI from Registry Contract",
-    "2. Arweave: Read Passport Metadata",
-    "3. Sepolia: Read PassportURI from Registry Contract",
-    "4. Arweave: Read Passport Data",
-]
-
-update_labels = [
-    "1. Arweave: Upload Passport Data",
-    "2. Sepolia: Update Identifier on Registry Contract",
-]
-
-delete_labels = [
-    "1. Sepolia: Delete Identifier on Registry Contract",
-]
+                stream.decode()
+            if stream.peek() == ",":
+                stream.pos += 1
+        stream.consume("}")
 
 
-def process_passport_type_performance_data(
-    arweave_data,
-    did_registry_data,
-    halo_nfc_metadata_registry_data,
-    nft_registry_data,
-    pbt_registry_data,
-):
-    arweave_duration_mean = compute_duration_mean(arweave_data)
-    did_registry_duration_mean = compute_duration_mean(did_registry_data)
-    halo_nfc_metadata_registry_duration_mean = compute_duration_mean(
-        halo_nfc_metadata_registry_data
-    )
-    nft_registry_duration_mean = compute_duration_mean(nft_registry_data)
-    pbt_registry_duration_mean = compute_duration_mean(pbt_registry_data)
-
-    depolyment_data = {
-        "QR Code x NFT": [
-            nft_registry_duration_mean["deployment"],
-            0,
-        ],
-        "QR Code x DID": [
-            did_registry_duration_mean["deployment"],
-            0,
-        ],
-        "HaLo NFC x PBT": [
-            pbt_registry_duration_mean["deployment"],
-            halo_nfc_metadata_registry_duration_mean["deployment"],
-        ],
-        "HaLo NFC x DID": [
-            did_registry_duration_mean["deployment"],
-            halo_nfc_metadata_registry_duration_mean["deployment"],
-        ],
+def _empty_steps():
+    return {action: {column: [] for column in STEP_COLUMNS} for action in ACTIONS}
+
+
+def _build_store(steps, reduction):
+    steps = {action: lists_to_columns(steps[action]) for action in ACTIONS}
+
+    return {
+        "runs": {
+            action: add_local_time(aggregate_steps(steps[action], reduction))
+            for action in ACTIONS
+        },
+        "steps": {action: add_local_time(steps[action]) for action in ACTIONS},
+        "calls": {
+            action: {
+                function_name: add_local_time(calls)
+                for function_name, calls in group_by_function(steps[action]).items()
+            }
+            for action in ACTIONS
+        },
     }
 
-    create_data = {
-        "QR Code x NFT": [
-            arweave_duration_mean["create"],
-            nft_registry_duration_mean["create"],
-            arweave_duration_mean["create"],
-            0,
-        ],
-        "QR Code x DID": [
-            arweave_duration_mean["create"],
-            did_registry_duration_mean["create"],
-            arweave_duration_mean["create"],
-            0,
-        ],
-        "HaLo NFC x PBT": [
-            arweave_duration_mean["create"],
-            pbt_registry_duration_mean["create"],
-            arweave_duration_mean["create"],
-            halo_nfc_metadata_registry_duration_mean["create"],
-        ],
-        "HaLo NFC x DID": [
-            arweave_duration_mean["create"],
-            did_registry_duration_mean["create"],
-            arweave_duration_mean["create"],
-            halo_nfc_metadata_registry_duration_mean["create"],
-        ],
+
+def _append_run(steps, run, record):
+    for action in ACTIONS:
+        if not record.get(action):
+            continue
+
+        for step, item in enumerate(record[action]):
+            steps[action]["run"].append(run)
+            steps[action]["step"].append(step)
+            for column in STEP_COLUMNS:
+                if column in item:
+                    steps[action][column].append(item[column])
+
+
+@profiled
+def build_chain_stores(data_path, reduction="skip_first"):
+    # one pass over the file builds the store of every chain in it
+    chain_steps = {}
+    chain_runs = {}
+
+    for chain_id, record in iter_chain_records(data_path):
+        if chain_id not in chain_steps:
+            chain_steps[chain_id] = _empty_steps()
+            chain_runs[chain_id] = 0
+        _append_run(chain_steps[chain_id], chain_runs[chain_id], record)
+        chain_runs[chain_id] += 1
+
+    return {
+        chain_id: _build_store(steps, reduction)
+        for chain_id, steps in chain_steps.items()
     }
 
-    read_data = {
-        "QR Code x NFT": [
-            0,
-            arweave_duration_mean["read"],
-            nft_registry_duration_mean["read"],
-            arweave_duration_mean["read"],
-        ],
-        "QR Code x DID": [
-            0,
-            arweave_duration_mean["read"],
-            did_registry_duration_mean["read"],
-            arweave_duration_mean["read"],
-        ],
-        "HaLo NFC x PBT": [
-            halo_nfc_metadata_registry_duration_mean["read"],
-            arweave_duration_mean["read"],
-            pbt_registry_duration_mean["read"],
-            arweave_duration_mean["read"],
-        ],
-        "HaLo NFC x DID": [
-            halo_nfc_metadata_registry_duration_mean["read"],
-            arweave_duration_mean["read"],
-            did_registry_duration_mean["read"],
-            arweave_duration_mean["read"],
-        ],
+
+@profiled
+def load_chain_stores(data_path, reduction="skip_first", use_cache=True):
+    if data_path.endswith(LOG_EXTENSION):
+        return _load_log(
+            data_path,
+            _read_registry_log,
+            _build_log_chain_stores,
+            use_cache,
+            reduction,
+        )
+    if use_cache:
+        return cached_load(data_path, build_chain_stores, reduction)
+    return build_chain_stores(data_path, reduction)
+
+
+def data_file(path):
+    # path without extension; an append-only log is preferred over the JSON file
+    log_path = f"{path}{LOG_EXTENSION}"
+    return log_path if os.path.exists(log_path) else f"{path}.json"
+
+
+def iter_log_records(file_path, offset=0):
+    # yields (record, offset after its line) for every complete line after
+    # offset; a last line that is still being written is left for the next read
+    with open(file_path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            if line.strip():
+                yield json.loads(line), offset
+
+
+def _append_columns(columns, new_columns):
+    return {
+        column: (
+            np.concatenate([columns[column], new_columns[column]])
+            if column in columns
+            else new_columns[column]
+        )
+        for column in new_columns
+    } | {column: columns[column] for column in columns if column not in new_columns}
+
+
+def _read_measurement_log(file_path, offset, state):
+    # state: action -> measurement columns; log lines look like
+    # {"create": [...], "read": [...], "update": [...]}
+    records = {}
+    for record, offset in iter_log_records(file_path, offset):
+        for action, items in record.items():
+            records.setdefault(action, []).extend(items)
+
+    state = dict(state)
+    for action, items in records.items():
+        state[action] = _append_columns(
+            state.get(action, {}), records_to_columns(items)
+        )
+    return state, offset
+
+
+def _build_log_measurements(state):
+    return {action: add_local_time(columns) for action, columns in state.items()}
+
+
+def _read_registry_log(file_path, offset, state):
+    # state: chain id -> action -> step columns; log lines are the runs of
+    # data/contracts/*.json with their chain, {"chain": "11155111", ...}
+    chain_steps = {}
+    chain_runs = {}
+    for record, offset in iter_log_records(file_path, offset):
+        chain_id = record["chain"]
+        if chain_id not in chain_steps:
+            chain_steps[chain_id] = _empty_steps()
+            # runs continue the numbering of the runs read before
+            chain_runs[chain_id] = max(
+                [
+                    int(columns["run"][-1]) + 1
+                    for columns in state.get(chain_id, {}).values()
+                    if "run" in columns
+                ],
+                default=0,
+            )
+        _append_run(chain_steps[chain_id], chain_runs[chain_id], record)
+        chain_runs[chain_id] += 1
+
+    state = dict(state)
+    for chain_id, steps in chain_steps.items():
+        state[chain_id] = {
+            action: _append_columns(
+                state.get(chain_id, {}).get(action, {}),
+                lists_to_columns(steps[action]),
+            )
+            for action in ACTIONS
+        }
+    return state, offset
+
+
+def _build_log_chain_stores(state, reduction="skip_first"):
+    return {
+        chain_id: _build_store(steps, reduction) for chain_id, steps in state.items()
     }
 
-    update_data = {
-        "QR Code x NFT": [
-            arweave_duration_mean["update"],
-            nft_registry_duration_mean["update"],
-        ],
-        "QR Code x DID": [
-            arweave_duration_mean["update"],
-            did_registry_duration_mean["update"],
-        ],
-        "HaLo NFC x PBT": [
-            arweave_duration_mean["update"],
-            pbt_registry_duration_mean["update"],
-        ],
-        "HaLo NFC x DID": [
-            arweave_duration_mean["update"],
-            did_registry_duration_mean["update"],
-        ],
+
+def _load_log(file_path, read_function, build_function, use_cache, *args):
+    if use_cache:
+        return cached_log_load(file_path, read_function, build_function, *args)
+    state, _ = read_function(file_path, 0, {})
+    return build_function(state, *args)
+
+
+def load_registry_store(
+    data_path, reduction="skip_first", use_cache=True, chain_id=SEPOLIA_CHAIN_ID
+):
+    chain_stores = load_chain_stores(data_path, reduction, use_cache)
+    if chain_id not in chain_stores:
+        return _build_store(_empty_steps(), reduction)
+    return chain_stores[chain_id]
+
+
+def process_registry_data(
+    data_path, reduction="skip_first", use_cache=True, chain_id=SEPOLIA_CHAIN_ID
+):
+    return load_registry_store(data_path, reduction, use_cache, chain_id)["runs"]
+
+
+def function_call_means(calls, xlabels, column, scale=1):
+    # calls: action -> functionName -> columns, xlabels: action -> x label;
+    # x label -> mean of every function, the function names and the x labels
+    # of the actions with calls
+    actions = [action for action in xlabels if calls.get(action)]
+    labels = list(
+        dict.fromkeys(
+            function_name for action in actions for function_name in calls[action]
+        )
+    )
+
+    data = {
+        xlabels[action]: [
+            (
+                column_mean(calls[action][function_name], column) / scale
+                if function_name in calls[action]
+                else 0
+            )
+            for function_name in labels
+        ]
+        for action in actions
     }
+    return data, labels, [xlabels[action] for action in actions]
 
-    delete_data = {
-        "QR Code x NFT": [
-            nft_registry_duration_mean["delete"],
-        ],
-        "QR Code x DID": [
-            did_registry_duration_mean["delete"],
-        ],
-        "HaLo NFC x PBT": [
-            pbt_registry_duration_mean["delete"],
-        ],
-        "HaLo NFC x DID": [
-            did_registry_duration_mean["delete"],
-        ],
+
+def registry_chain_tables(registry_stores, table="runs"):
+    # registry -> chain id -> one table ("runs", "steps" or "calls") of the
+    # load_chain_stores output of every registry
+    return {
+        registry: {chain_id: store[table] for chain_id, store in stores.items()}
+        for registry, stores in registry_stores.items()
     }
 
-    return [
-        {
-            "operation": "Deployment",
-            "data": depolyment_data,
-            "labels": deployment_labels,
-        },
-        {
-            "operation": "Creation",
-            "data": create_data,
-            "labels": create_labels,
-        },
-        {
-            "operation": "Reading",
-            "data": read_data,
-            "labels": read_labels,
-        },
-        {
-            "operation": "Update",
-            "data": update_data,
-            "labels": update_labels,
-        },
-        {
-            "operation": "Deletion",
-            "data": delete_data,
-            "labels": delete_labels,
-        },
-    ]
 
+def chain_name(chain_id):
+    return CHAIN_NAMES.get(chain_id, f"Chain {chain_id}")
 
-def process_passport_type_gas_costs_data(
+
+def select_chain(chains, chain_id=SEPOLIA_CHAIN_ID):
+    # one chain out of a registry_chain_tables entry
+    if chain_id not in chains:
+        return {action: {} for action in ACTIONS}
+    return chains[chain_id]
+
+
+def passport_type_sources(
+    arweave_data,
     did_registry_data,
     halo_nfc_metadata_registry_data,
     nft_registry_data,
     pbt_registry_data,
 ):
-    did_registry_gas_costs_mean = compute_gas_costs_mean(did_registry_data)
-    halo_nfc_metadata_registry_gas_costs_mean = compute_gas_costs_mean(
-        halo_nfc_metadata_registry_data
-    )
-    nft_registry_gas_costs_mean = compute_gas_costs_mean(nft_registry_data)
-    pbt_registry_gas_costs_mean = compute_gas_costs_mean(pbt_registry_data)
-
-    deployment_data = {
-        "QR Code x NFT": [
-            nft_registry_gas_costs_mean["deployment"],
-            0,
-        ],
-        "QR Code x DID": [
-            did_registry_gas_costs_mean["deployment"],
-            0,
-        ],
-        "HaLo NFC x PBT": [
-            pbt_registry_gas_costs_mean["deployment"],
-            halo_nfc_metadata_registry_gas_costs_mean["deployment"],
-        ],
-        "HaLo NFC x DID": [
-            did_registry_gas_costs_mean["deployment"],
-            halo_nfc_metadata_registry_gas_costs_mean["deployment"],
-        ],
+    return {
+        ARWEAVE: arweave_data,
+        DID_REGISTRY: did_registry_data,
+        HALO_NFC_METADATA_REGISTRY: halo_nfc_metadata_registry_data,
+        NFT_REGISTRY: nft_registry_data,
+        PBT_REGISTRY: pbt_registry_data,
     }
 
-    create_data = {
-        "QR Code x NFT": [
-            0,
-            nft_registry_gas_costs_mean["create"],
-            0,
-            0,
-        ],
-        "QR Code x DID": [
-            0,
-            did_registry_gas_costs_mean["create"],
-            0,
-            0,
-        ],
-        "HaLo NFC x PBT": [
-            0,
-            pbt_registry_gas_costs_mean["create"],
-            0,
-            halo_nfc_metadata_registry_gas_costs_mean["create"],
-        ],
-        "HaLo NFC x DID": [
-            0,
-            did_registry_gas_costs_mean["create"],
-            0,
-            halo_nfc_metadata_registry_gas_costs_mean["create"],
-        ],
-    }
 
-    read_data = {
-        "QR Code x NFT": [
-            0,
-            0,
-            nft_registry_gas_costs_mean["read"],
-            0,
-        ],
-        "QR Code x DID": [
-            0,
-            0,
-            did_registry_gas_costs_mean["read"],
-            0,
-        ],
-        "HaLo NFC x PBT": [
-            halo_nfc_metadata_registry_gas_costs_mean["read"],
-            0,
-            pbt_registry_gas_costs_mean["read"],
-            0,
-        ],
-        "HaLo NFC x DID": [
-            halo_nfc_metadata_registry_gas_costs_mean["read"],
-            0,
-            did_registry_gas_costs_mean["read"],
-            0,
-        ],
-    }
+@profiled
+def process_passport_type_performance_data(
+    arweave_data,
+    did_registry_data,
+    halo_nfc_metadata_registry_data,
+    nft_registry_data,
+    pbt_registry_data,
+    statistic="mean",
+    outliers=None,
+):
+    sources = passport_type_sources(
+        arweave_data,
+        did_registry_data,
+        halo_nfc_metadata_registry_data,
+        nft_registry_data,
+        pbt_registry_data,
+    )
+    return evaluate_passport_types(sources, "duration", statistic, outliers=outliers)
 
-    update_data = {
-        "QR Code x NFT": [
-            0,
-            nft_registry_gas_costs_mean["update"],
-        ],
-        "QR Code x DID": [
-            0,
-            did_registry_gas_costs_mean["update"],
-        ],
-        "HaLo NFC x PBT": [
-            0,
-            pbt_registry_gas_costs_mean["update"],
-        ],
-        "HaLo NFC x DID": [
-            0,
-            did_registry_gas_costs_mean["update"],
-        ],
-    }
 
-    delete_data = {
-        "QR Code x NFT": [
-            nft_registry_gas_costs_mean["delete"],
-        ],
-        "QR Code x DID": [
-            did_registry_gas_costs_mean["delete"],
-        ],
-        "HaLo NFC x PBT": [
-            pbt_registry_gas_costs_mean["delete"],
-        ],
-        "HaLo NFC x DID": [
-            did_registry_gas_costs_mean["delete"],
-        ],
+@profiled
+def process_passport_type_gas_costs_data(
+    did_registry_data,
+    halo_nfc_metadata_registry_data,
+    nft_registry_data,
+    pbt_registry_data,
+    statistic="mean",
+    outliers=None,
+    metric="gas_costs",
+):
+    # metric: "gas_costs" in wei or "costs_usd"
+    sources = {
+        DID_REGISTRY: did_registry_data,
+        HALO_NFC_METADATA_REGISTRY: halo_nfc_metadata_registry_data,
+        NFT_REGISTRY: nft_registry_data,
+        PBT_REGISTRY: pbt_registry_data,
     }
-
-    return [
-        {
-            "operation": "Deployment",
-            "data": deployment_data,
-            "labels": deployment_labels,
-        },
-        {
-            "operation": "Creation",
-            "data": create_data,
-            "labels": create_labels,
-        },
-        {
-            "operation": "Reading",
-            "data": read_data,
-            "labels": read_labels,
-        },
-        {
-            "operation": "Update",
-            "data": update_data,
-            "labels": update_labels,
-        },
-        {
-            "operation": "Deletion",
-            "data": delete_data,
-            "labels": delete_labels,
-        },
-    ]
+    return evaluate_passport_types(sources, metric, statistic, outliers=outliers)
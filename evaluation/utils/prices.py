@@ -0,0 +1,114 @@
+import os
+
+import numpy as np
+import pandas as pd
+from utils.export import check_table_format
+from utils.units import ETH_TO_USD, wei_to_eth
+
+# optional ETH/USD price history in the data directory, one price per row with
+# a timestamp (milliseconds since the epoch or ISO 8601) and a usd column;
+# without it every run is priced at ETH_TO_USD
+PRICE_HISTORY_FILES = ["eth-usd.parquet", "eth-usd.csv"]
+TIMESTAMP_COLUMN = "timestamp"
+PRICE_COLUMN = "usd"
+# column added to every measurement table with gas costs
+USD_COLUMN = "gasCostsInUsd"
+
+
+def _timestamps_in_ms(values):
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=np.int64)
+    return (
+        pd.to_datetime(values, utc=True)
+        .dt.tz_localize(None)
+        .to_numpy(dtype="datetime64[ms]")
+        .astype(np.int64)
+    )
+
+
+def read_price_history(file_path):
+    # (timestamps in ms, prices), sorted by timestamp
+    if file_path.endswith(".parquet"):
+        check_table_format("parquet")
+        frame = pd.read_parquet(file_path, columns=[TIMESTAMP_COLUMN, PRICE_COLUMN])
+    else:
+        frame = pd.read_csv(file_path, usecols=[TIMESTAMP_COLUMN, PRICE_COLUMN])
+    frame = frame.dropna()
+    if frame.empty:
+        raise ValueError(f"{file_path} contains no prices.")
+
+    timestamps = _timestamps_in_ms(frame[TIMESTAMP_COLUMN])
+    prices = frame[PRICE_COLUMN].to_numpy(dtype=np.float64)
+    order = np.argsort(timestamps, kind="stable")
+    return timestamps[order], prices[order]
+
+
+def price_history_files(data_path="data"):
+    # the candidates, whether they exist or not
+    return [os.path.join(data_path, file_name) for file_name in PRICE_HISTORY_FILES]
+
+
+def price_history_file(data_path="data"):
+    for file_path in price_history_files(data_path):
+        if os.path.exists(file_path):
+            return file_path
+    return None
+
+
+def load_price_history(data_path="data"):
+    file_path = price_history_file(data_path)
+    return read_price_history(file_path) if file_path else None
+
+
+def prices_at(history, timestamps_in_ms):
+    # as-of join: the last price at or before every timestamp; timestamps
+    # before the first price get the first price
+    timestamps_in_ms = np.asarray(timestamps_in_ms, dtype=np.int64)
+    if history is None:
+        return np.full(timestamps_in_ms.shape, ETH_TO_USD)
+    timestamps, prices = history
+    indices = np.searchsorted(timestamps, timestamps_in_ms, side="right") - 1
+    return prices[np.clip(indices, 0, len(prices) - 1)]
+
+
+def add_usd_column(columns, history):
+    # columns: one measurement table; prices every row at its start
+    if "gasCostsInWei" in columns:
+        columns[USD_COLUMN] = wei_to_eth(columns["gasCostsInWei"]) * prices_at(
+            history, columns["startTimestamp"]
+        )
+    return columns
+
+
+def price_stores(stores, history):
+    # stores: output of load_chain_stores; adds USD_COLUMN to the runs, steps
+    # and calls of every chain
+    for store in stores.values():
+        for action in store["runs"]:
+            add_usd_column(store["runs"][action], history)
+            add_usd_column(store["steps"][action], history)
+            for columns in store["calls"][action].values():
+                add_usd_column(columns, history)
+    return stores
+
+
+def effective_rate(gas_costs_in_ether, gas_costs_in_usd):
+    # the single ETH/USD rate that converts the total ETH into the total USD,
+    # e.g. for a secondary USD axis next to ETH amounts
+    total_ether = np.sum(gas_costs_in_ether)
+    if total_ether == 0:
+        return ETH_TO_USD
+    return float(np.sum(gas_costs_in_usd) / total_ether)
+
+
+def usd_costs(columns):
+    # USD_COLUMN of a measurement table, or its gas costs at ETH_TO_USD when it
+    # was not priced with price_stores
+    if USD_COLUMN in columns:
+        return columns[USD_COLUMN]
+    return wei_to_eth(columns["gasCostsInWei"]) * ETH_TO_USD
+
+
+def rate_functions(rate):
+    # ETH -> USD and back, e.g. for secondary_yaxis
+    return (lambda y: y * rate, lambda y: y / rate)
@@ -0,0 +1,216 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+
+# PERMAPASS_PROFILE=1 profiles into PROFILE_FILE, any other value is taken as
+# the output path. Paths ending in .folded get folded stacks for flamegraph.pl,
+# everything else a Chrome trace (chrome://tracing, Perfetto, speedscope).
+PROFILE_ENV = "PERMAPASS_PROFILE"
+PROFILE_FILE = "profile-trace.json"
+
+_enabled = False
+_events = []
+_local = threading.local()
+
+
+def is_enabled():
+    return _enabled
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def enable(output_path=PROFILE_FILE, trace_allocations=True):
+    # the report is written to output_path once the process exits; processes
+    # without an output_path hand their events over with take_events()
+    global _enabled
+    if _enabled:
+        return
+    _enabled = True
+    if trace_allocations and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if output_path:
+        atexit.register(write_report, output_path)
+
+
+def enable_from_environment():
+    value = os.environ.get(PROFILE_ENV)
+    if value:
+        enable(PROFILE_FILE if value == "1" else value)
+
+
+def take_events():
+    # hands the events recorded so far over, e.g. from a worker process
+    events = _events[:]
+    _events.clear()
+    return events
+
+
+def add_events(events):
+    _events.extend(events)
+
+
+@contextmanager
+def stage(name, **args):
+    if not _enabled:
+        yield
+        return
+
+    stack = _stack()
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        start_memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+    frame = {"name": name, "child_wall": 0.0, "child_peak": 0}
+    stack.append(frame)
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - start_wall
+        cpu = time.process_time() - start_cpu
+        stack.pop()
+
+        event = {
+            "name": name,
+            "stack": [parent["name"] for parent in stack] + [name],
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "start": start_wall,
+            "wall_s": wall,
+            "self_s": wall - frame["child_wall"],
+            "cpu_s": cpu,
+            "args": args,
+        }
+        if tracing:
+            # reset_peak() of nested stages drops the peak of their parents,
+            # so the peak seen by children is carried upwards
+            end_memory, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, frame["child_peak"])
+            event["allocated_bytes"] = end_memory - start_memory
+            event["peak_bytes"] = peak - start_memory
+        _events.append(event)
+
+        if stack:
+            stack[-1]["child_wall"] += wall
+            if tracing:
+                stack[-1]["child_peak"] = max(stack[-1]["child_peak"], peak)
+
+
+def profiled(function=None, name=None):
+    # decorator recording every call of a function as a stage
+    if function is None:
+        return lambda function: profiled(function, name)
+
+    stage_name = name or function.__qualname__
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return function(*args, **kwargs)
+        with stage(stage_name):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+def summarize_events(events):
+    # one row per stage and output file, ordered by total wall time
+    rows = {}
+    for event in events:
+        key = (event["name"], event["args"].get("output"))
+        row = rows.setdefault(
+            key,
+            {
+                "stage": key[0],
+                "output": key[1],
+                "calls": 0,
+                "wall_s": 0.0,
+                "self_s": 0.0,
+                "cpu_s": 0.0,
+                "allocated_bytes": 0,
+                "peak_bytes": 0,
+            },
+        )
+        row["calls"] += 1
+        row["wall_s"] += event["wall_s"]
+        row["self_s"] += event["self_s"]
+        row["cpu_s"] += event["cpu_s"]
+        row["allocated_bytes"] += event.get("allocated_bytes", 0)
+        row["peak_bytes"] = max(row["peak_bytes"], event.get("peak_bytes", 0))
+    return sorted(rows.values(), key=lambda row: row["wall_s"], reverse=True)
+
+
+def chrome_trace(events):
+    origin = min((event["start"] for event in events), default=0)
+    return {
+        "traceEvents": [
+            {
+                "name": event["name"],
+                "ph": "X",
+                "pid": event["pid"],
+                "tid": event["tid"],
+                "ts": (event["start"] - origin) * 1e6,
+                "dur": event["wall_s"] * 1e6,
+                "args": {
+                    **event["args"],
+                    "cpu_s": event["cpu_s"],
+                    "allocated_bytes": event.get("allocated_bytes"),
+                    "peak_bytes": event.get("peak_bytes"),
+                },
+            }
+            for event in events
+        ],
+        "displayTimeUnit": "ms",
+        "otherData": {"stages": summarize_events(events)},
+    }
+
+
+def folded_stacks(events):
+    # "parent;child self-time-in-microseconds" lines as read by flamegraph.pl
+    samples = {}
+    for event in events:
+        key = ";".join(event["stack"])
+        samples[key] = samples.get(key, 0) + event["self_s"]
+    return "".join(
+        f"{key} {round(seconds * 1e6)}\n" for key, seconds in samples.items()
+    )
+
+
+def print_summary(events, file=sys.stderr):
+    print(
+        f"{'stage':<80} {'calls':>6} {'wall s':>9} {'self s':>9} {'cpu s':>9} "
+        f"{'alloc MiB':>10}",
+        file=file,
+    )
+    for row in summarize_events(events):
+        name = (
+            row["stage"] if not row["output"] else f"{row['stage']} ({row['output']})"
+        )
+        print(
+            f"{name:<80} {row['calls']:>6} {row['wall_s']:>9.3f} "
+            f"{row['self_s']:>9.3f} {row['cpu_s']:>9.3f} "
+            f"{row['allocated_bytes'] / 2**20:>10.1f}",
+            file=file,
+        )
+
+
+def write_report(output_path=PROFILE_FILE):
+    events = take_events()
+    with open(output_path, "w") as f:
+        if output_path.endswith(".folded"):
+            f.write(folded_stacks(events))
+        else:
+            json.dump(chrome_trace(events), f)
+    print_summary(events)
+    print(f"Profile written to {output_path}", file=sys.stderr)
@@ -0,0 +1,151 @@
+import math
+
+import numpy as np
+from utils.statistics import BOOTSTRAP_BATCH_SIZE, BOOTSTRAP_SAMPLES, CONFIDENCE
+
+# column -> percentile compared between the measurement sets and the largest
+# accepted increase of it in percent
+GATE_METRICS = {
+    "gasUsed": {"percentile": 50, "max_increase": 1.0},
+    "durationInMs": {"percentile": 95, "max_increase": 10.0},
+}
+# significance level of the one-sided Mann-Whitney U test
+ALPHA = 0.05
+# smaller samples are compared but never flagged
+MIN_SAMPLES = 2
+
+
+def mann_whitney(baseline, candidate):
+    # U statistic of the candidate (pairs where it is larger, ties count half)
+    # and the one-sided p-value of candidate values tending to be larger;
+    # normal approximation with tie and continuity correction
+    baseline = np.sort(np.asarray(baseline, dtype=np.float64))
+    candidate = np.asarray(candidate, dtype=np.float64)
+    n_baseline, n_candidate = len(baseline), len(candidate)
+    below = np.searchsorted(baseline, candidate, side="left")
+    equal = np.searchsorted(baseline, candidate, side="right") - below
+    u = float((below + equal / 2).sum())
+
+    n = n_baseline + n_candidate
+    _, ties = np.unique(np.concatenate([baseline, candidate]), return_counts=True)
+    variance = (
+        n_baseline
+        * n_candidate
+        / 12
+        * ((n + 1) - (ties**3 - ties).sum() / (n * (n - 1)))
+    )
+    if variance <= 0:
+        # all values are equal
+        return u, 1.0
+    z = (u - n_baseline * n_candidate / 2 - 0.5) / math.sqrt(variance)
+    return u, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def _bootstrap_percentiles(values, percentile, n_samples, rng):
+    percentiles = np.empty(n_samples)
+    batch_size = max(1, BOOTSTRAP_BATCH_SIZE // len(values))
+    for start in range(0, n_samples, batch_size):
+        stop = min(start + batch_size, n_samples)
+        indices = rng.integers(0, len(values), size=(stop - start, len(values)))
+        percentiles[start:stop] = np.percentile(values[indices], percentile, axis=1)
+    return percentiles
+
+
+def bootstrap_percentile_difference(
+    baseline,
+    candidate,
+    percentile=50,
+    n_samples=BOOTSTRAP_SAMPLES,
+    confidence=CONFIDENCE,
+    seed=0,
+):
+    # confidence interval of the percentile of the candidate minus the one of
+    # the baseline, e.g. the difference of medians for 50
+    rng = np.random.default_rng(seed)
+    differences = _bootstrap_percentiles(
+        np.asarray(candidate, dtype=np.float64), percentile, n_samples, rng
+    ) - _bootstrap_percentiles(
+        np.asarray(baseline, dtype=np.float64), percentile, n_samples, rng
+    )
+    alpha = (1 - confidence) / 2
+    return np.quantile(differences, [alpha, 1 - alpha])
+
+
+def compare_values(baseline, candidate, percentile, max_increase, alpha=ALPHA):
+    # a regression is an increase of the percentile by more than max_increase
+    # percent that both the Mann-Whitney test and the bootstrap interval of
+    # the percentile's difference find significant
+    baseline_value, candidate_value = (
+        np.percentile(values, percentile) for values in (baseline, candidate)
+    )
+    change_pct = (
+        100 * (candidate_value - baseline_value) / baseline_value
+        if baseline_value
+        else (math.inf if candidate_value > 0 else 0.0)
+    )
+    u, p_value = mann_whitney(baseline, candidate)
+    ci_low, ci_high = bootstrap_percentile_difference(baseline, candidate, percentile)
+    regression = bool(
+        min(len(baseline), len(candidate)) >= MIN_SAMPLES
+        and change_pct > max_increase
+        and p_value < alpha
+        and ci_low > 0
+    )
+    return {
+        "statistic": f"p{percentile}",
+        "baseline_count": len(baseline),
+        "candidate_count": len(candidate),
+        "baseline": baseline_value,
+        "candidate": candidate_value,
+        "change_pct": change_pct,
+        "u": u,
+        "p_value": p_value,
+        "diff_ci_low": ci_low,
+        "diff_ci_high": ci_high,
+        "regression": regression,
+    }
+
+
+def _compared_tables(baseline_store, candidate_store):
+    # (action, functionName, baseline columns, candidate columns) of the runs
+    # and function calls both stores have; runs have no function name
+    for action, columns in baseline_store["runs"].items():
+        if columns and candidate_store["runs"].get(action):
+            yield action, "", columns, candidate_store["runs"][action]
+        candidate_calls = candidate_store["calls"].get(action, {})
+        for function_name, calls in baseline_store["calls"].get(action, {}).items():
+            if function_name in candidate_calls:
+                yield action, function_name, calls, candidate_calls[function_name]
+
+
+def regression_rows(
+    baseline_stores, candidate_stores, metrics=GATE_METRICS, alpha=ALPHA
+):
+    # stores: registry -> load_registry_store output of one measurement set;
+    # one row per registry, action, functionName and metric both sets measured
+    rows = []
+    for registry, baseline_store in baseline_stores.items():
+        if registry not in candidate_stores:
+            continue
+        for action, function_name, baseline, candidate in _compared_tables(
+            baseline_store, candidate_stores[registry]
+        ):
+            for column, gate in metrics.items():
+                if column not in baseline or column not in candidate:
+                    continue
+                rows.append(
+                    {
+                        "registry": registry,
+                        "action": action,
+                        "functionName": function_name,
+                        "metric": column,
+                        **compare_values(
+                            baseline[column],
+                            candidate[column],
+                            gate["percentile"],
+                            gate["max_increase"],
+                            alpha,
+                        ),
+                    }
+                )
+    return rows
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+
+import matplotlib
+import numpy as np
+import seaborn as sns
+from utils import helpers, units
+from utils.helpers import OUTPUT_PATH
+from utils.profiling import add_events, enable, is_enabled, profiled, stage, take_events
+
+MANIFEST_FILENAME = "render-manifest.json"
+UTILS_PATH = os.path.dirname(os.path.abspath(__file__))
+
+# A chart to render: the plot function and the keyword arguments it is called
+# with. Every plot function takes an `output_filename` keyword argument.
+RenderJob = namedtuple("RenderJob", ["plot_function", "kwargs"])
+
+
+def render_job(plot_function, **kwargs):
+    return RenderJob(plot_function, kwargs)
+
+
+def job_output_filename(job):
+    return job.kwargs["output_filename"]
+
+
+def _update_fingerprint(digest, value):
+    if isinstance(value, np.ndarray):
+        digest.update(f"ndarray:{value.dtype}:{value.shape}".encode())
+        if value.dtype == object:
+            digest.update(repr(value.tolist()).encode())
+        else:
+            digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        digest.update(f"dict:{len(value)}".encode())
+        for key, item in value.items():
+            _update_fingerprint(digest, key)
+            _update_fingerprint(digest, item)
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"list:{len(value)}".encode())
+        for item in value:
+            _update_fingerprint(digest, item)
+    else:
+        digest.update(f"{type(value).__name__}:{value!r}".encode())
+
+
+def _helper_constants():
+    return {
+        name: value
+        for module in [helpers, units]
+        for name, value in vars(module).items()
+        if name.isupper() and isinstance(value, (bool, int, float, str))
+    }
+
+
+@cache
+def _code_fingerprint():
+    # the source of every utils module, e.g. the resampling of utils.timeseries,
+    # and the versions of the plotting libraries
+    digest = hashlib.sha256()
+    for file_name in sorted(os.listdir(UTILS_PATH)):
+        if file_name.endswith(".py"):
+            with open(os.path.join(UTILS_PATH, file_name), "rb") as f:
+                _update_fingerprint(digest, file_name)
+                digest.update(f.read())
+    _update_fingerprint(digest, matplotlib.__version__)
+    _update_fingerprint(digest, sns.__version__)
+    return digest.hexdigest()
+
+
+@profiled
+def job_fingerprint(job):
+    digest = hashlib.sha256()
+    # the code behind the charts is part of the fingerprint, so changing how a
+    # chart is drawn, or upgrading matplotlib, also re-renders it
+    _update_fingerprint(digest, _code_fingerprint())
+    _update_fingerprint(digest, job.plot_function.__qualname__)
+    _update_fingerprint(digest, _helper_constants())
+    _update_fingerprint(digest, job.kwargs)
+    return digest.hexdigest()
+
+
+def load_manifest(output_path=OUTPUT_PATH):
+    manifest_path = os.path.join(output_path, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, output_path=OUTPUT_PATH):
+    with open(os.path.join(output_path, MANIFEST_FILENAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def _is_up_to_date(job, fingerprint, manifest, output_path):
+    output_filename = job_output_filename(job)
+    return manifest.get(output_filename) == fingerprint and os.path.exists(
+        os.path.join(output_path, output_filename)
+    )
+
+
+def _run_render_job(job):
+    output_filename = job_output_filename(job)
+    with stage(job.plot_function.__qualname__, output=output_filename):
+        job.plot_function(**job.kwargs)
+    return output_filename
+
+
+def _run_profiled_render_job(job):
+    # worker processes return their events to the profiling parent; forked
+    # workers start with a copy of the parent's events, which are dropped
+    enable(output_path=None)
+    take_events()
+    output_filename = _run_render_job(job)
+    return output_filename, take_events()
+
+
+@profiled
+def run_render_jobs(jobs, n_jobs=1, use_cache=True, output_path=OUTPUT_PATH):
+    os.makedirs(output_path, exist_ok=True)
+    manifest = load_manifest(output_path) if use_cache else {}
+    fingerprints = {job_output_filename(job): job_fingerprint(job) for job in jobs}
+
+    stale_jobs = [
+        job
+        for job in jobs
+        if not _is_up_to_date(
+            job, fingerprints[job_output_filename(job)], manifest, output_path
+        )
+    ]
+
+    if n_jobs <= 1:
+        rendered = [_run_render_job(job) for job in stale_jobs]
+    elif is_enabled():
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            rendered = []
+            for output_filename, events in executor.map(
+                _run_profiled_render_job, stale_jobs
+            ):
+                rendered.append(output_filename)
+                add_events(events)
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            rendered = list(executor.map(_run_render_job, stale_jobs))
+
+    for output_filename in rendered:
+        manifest[output_filename] = fingerprints[output_filename]
+    save_manifest(manifest, output_path)
+
+    return rendered
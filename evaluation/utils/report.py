@@ -0,0 +1,475 @@
+import json
+import math
+import os
+
+import numpy as np
+from utils.charts import plan_render_jobs
+from utils.gas_costs import (
+    format_gas_costs,
+    plot_function_calls_gas_costs,
+    plot_gas_costs,
+    plot_passport_types_gas_costs,
+    plot_passport_types_operation_gas_costs,
+)
+from utils.helpers import (
+    OUTPUT_PATH,
+    duration_legend,
+    gas_costs_legend,
+    operation_sums,
+    row_normalize,
+    with_trimmed,
+)
+from utils.performance import (
+    format_durations,
+    plot_function_calls_performance,
+    plot_passport_types_operation_performance,
+    plot_passport_types_performance,
+    plot_performance,
+)
+from utils.preprocessing import function_call_means
+from utils.prices import effective_rate, usd_costs
+from utils.profiling import profiled
+from utils.rendering import job_output_filename
+from utils.store import local_start_times
+from utils.summary import (
+    costs_summary,
+    performance_summary,
+    plot_costs_summary,
+    plot_performance_summary,
+    plot_theoretical_criteria_summary,
+    theoretical_criteria_summary,
+)
+from utils.timeseries import MAX_MARKERS, prepare_series
+from utils.units import ether_label, ether_unit, eth_to_usd, wei_to_eth
+
+REPORT_FILE = os.path.join(OUTPUT_PATH, "report.html")
+TEMPLATE_FILE = os.path.join(os.path.dirname(__file__), "report_template.html")
+# the browser draws every embedded point, so series are downsampled further
+# than for the PNGs
+REPORT_MAX_POINTS = 1000
+# significant digits of the embedded values
+REPORT_DIGITS = 6
+
+
+def _usd_axis(gas_costs_in_ether, gas_costs_in_usd):
+    return {
+        "label": "USD",
+        "factor": effective_rate(gas_costs_in_ether, gas_costs_in_usd),
+    }
+
+
+def _delta_encoded(times):
+    # milliseconds of local wall-clock time: the first timestamp followed by the
+    # gaps between consecutive ones
+    milliseconds = np.asarray(times, dtype="datetime64[ms]").astype(np.int64)
+    return np.diff(milliseconds, prepend=0).tolist()
+
+
+def _rounded(values, digits=REPORT_DIGITS):
+    values = np.char.mod(f"%.{digits}g", np.asarray(values, dtype=np.float64))
+    return [
+        value if math.isfinite(value) else None
+        for value in values.astype(np.float64).tolist()
+    ]
+
+
+def _time_series(
+    data, label, values, flags, interval, rolling_window, statistic, max_points
+):
+    start_times = local_start_times(data)
+    times, series_values = prepare_series(
+        start_times, values, interval, rolling_window, statistic, max_points
+    )
+    series = {
+        "label": label,
+        "times": _delta_encoded(times),
+        "values": _rounded(series_values),
+        "markers": len(series_values) <= MAX_MARKERS,
+    }
+    if flags is not None:
+        series["outliers"] = {
+            "times": _delta_encoded(start_times.to_numpy()[flags]),
+            "values": _rounded(values[flags]),
+        }
+    return series
+
+
+def performance_chart(
+    data_list,
+    labels,
+    title,
+    x_axis,
+    is_arweave=False,
+    interval=None,
+    rolling_window=None,
+    statistic="mean",
+    max_points=REPORT_MAX_POINTS,
+    outliers=None,
+    network="Sepolia",
+):
+    # the chart of plot_performance
+    if x_axis not in ["ms", "s"]:
+        raise ValueError("Invalid x_axis value. Choose 'ms' or 's'.")
+    scale = 1000 if x_axis == "s" else 1
+    unit = "Seconds" if x_axis == "s" else "Milliseconds"
+
+    series = []
+    for data, label in zip(data_list, labels):
+        duration = data["durationInMs"] / scale
+        legend, flags = duration_legend(data, duration, unit, outliers)
+        series.append(
+            _time_series(
+                data,
+                f"{label} ({legend})",
+                duration,
+                flags,
+                interval,
+                rolling_window,
+                statistic,
+                max_points,
+            )
+        )
+
+    return {
+        "type": "line",
+        "title": title,
+        "xLabel": f'Execution Time {f"on {network} " if network and not is_arweave else ""}(CEST)',
+        "yLabel": f"Duration ({unit})",
+        "series": series,
+    }
+
+
+def gas_costs_chart(
+    data_list,
+    labels,
+    title,
+    interval=None,
+    rolling_window=None,
+    statistic="mean",
+    max_points=REPORT_MAX_POINTS,
+    outliers=None,
+    network="Sepolia",
+):
+    # the chart of plot_gas_costs
+    unit = ether_unit(network)
+    series = []
+    total_ether = 0
+    total_usd = 0
+    for data, label in zip(data_list, labels):
+        gas_costs_in_ether = wei_to_eth(data["gasCostsInWei"])
+        gas_costs_in_usd = usd_costs(data)
+        total_ether += gas_costs_in_ether.sum()
+        total_usd += gas_costs_in_usd.sum()
+        legend, flags = gas_costs_legend(
+            data, gas_costs_in_ether, gas_costs_in_usd, unit, outliers
+        )
+        series.append(
+            _time_series(
+                data,
+                f"{label} ({legend})",
+                gas_costs_in_ether,
+                flags,
+                interval,
+                rolling_window,
+                statistic,
+                max_points,
+            )
+        )
+
+    return {
+        "type": "line",
+        "title": title,
+        "xLabel": f'Execution Time {f"on {network} " if network else ""}(CEST)',
+        "yLabel": ether_label(network),
+        "secondaryAxis": _usd_axis(total_ether, total_usd),
+        "series": series,
+    }
+
+
+def _stacked_chart(
+    data,
+    labels,
+    title,
+    xlabels,
+    y_label,
+    format_labels,
+    secondary_data=None,
+    trimmed_data=None,
+    trimmed_secondary_data=None,
+    **axes,
+):
+    # data: x label -> value of every layer; layers are labelled inside the
+    # bar, totals above bars with more than one layer; secondary_data and the
+    # trimmed data like in plot_stacked_bar_chart, the trimmed totals follow
+    # the totals
+
+    def layers(layer_data):
+        return np.array([layer_data[key] for key in xlabels], dtype=np.float64).T
+
+    values = layers(data)
+    totals = values.sum(axis=0)
+    show_totals = (values > 0).sum(axis=0) > 1
+    if secondary_data is None:
+        texts = format_labels(values)
+        total_texts = format_labels(totals)
+    else:
+        secondary_values = layers(secondary_data)
+        texts = format_labels(values, secondary_values)
+        total_texts = format_labels(totals, secondary_values.sum(axis=0))
+    total_texts = np.where(show_totals, np.char.add("Total: ", total_texts), "")
+    if trimmed_data is not None:
+        trimmed_totals = layers(trimmed_data).sum(axis=0)
+        if secondary_data is None:
+            trimmed_texts = format_labels(trimmed_totals)
+        else:
+            trimmed_texts = format_labels(
+                trimmed_totals, layers(trimmed_secondary_data).sum(axis=0)
+            )
+        total_texts = np.char.add(
+            np.where(show_totals, np.char.add(total_texts, ", "), ""),
+            np.where(totals > 0, np.char.add("Trimmed: ", trimmed_texts), ""),
+        )
+    return {
+        "type": "stacked",
+        "title": title,
+        "yLabel": y_label,
+        "categories": list(xlabels),
+        "layers": [
+            {"label": label, "values": _rounded(layer_values), "texts": texts}
+            for label, layer_values, texts in zip(
+                labels,
+                values,
+                np.where(values != 0, texts, "").tolist(),
+            )
+        ],
+        "totals": total_texts.tolist(),
+        **axes,
+    }
+
+
+def function_calls_performance_chart(calls, xlabels, title):
+    data, labels, xlabels = function_call_means(calls, xlabels, "durationInMs", 1000)
+    return _stacked_chart(
+        data, labels, title, xlabels, "Duration (Seconds)", format_durations
+    )
+
+
+def _gas_costs_stacked_chart(
+    data,
+    labels,
+    title,
+    xlabels,
+    usd_data=None,
+    trimmed_data=None,
+    trimmed_usd_data=None,
+):
+    # data in wei, usd_data and the trimmed data like in
+    # plot_passport_types_operation_gas_costs
+    data = {key: wei_to_eth(np.asarray(values)) for key, values in data.items()}
+    if usd_data is None:
+        usd_data = {key: eth_to_usd(values) for key, values in data.items()}
+    if trimmed_data is not None:
+        trimmed_data = {
+            key: wei_to_eth(np.asarray(values)) for key, values in trimmed_data.items()
+        }
+        if trimmed_usd_data is None:
+            trimmed_usd_data = {
+                key: eth_to_usd(values) for key, values in trimmed_data.items()
+            }
+    return _stacked_chart(
+        data,
+        labels,
+        title,
+        xlabels,
+        "Sepolia ETH (SETH)",
+        format_gas_costs,
+        usd_data,
+        trimmed_data,
+        trimmed_usd_data,
+        secondaryAxis=_usd_axis(
+            [np.sum(values) for values in data.values()],
+            [np.sum(values) for values in usd_data.values()],
+        ),
+    )
+
+
+def function_calls_gas_costs_chart(calls, xlabels, title):
+    data, labels, actions = function_call_means(calls, xlabels, "gasCostsInWei")
+    usd_data, _, _ = function_call_means(calls, xlabels, "gasCostsInUsd")
+    return _gas_costs_stacked_chart(data, labels, title, actions, usd_data)
+
+
+def passport_types_operation_performance_chart(data, labels, title, trimmed_data=None):
+    return _stacked_chart(
+        data,
+        labels,
+        title,
+        list(data),
+        "Duration (Seconds)",
+        format_durations,
+        trimmed_data=trimmed_data,
+    )
+
+
+def passport_types_operation_gas_costs_chart(
+    data, labels, title, usd_data=None, trimmed_data=None, trimmed_usd_data=None
+):
+    return _gas_costs_stacked_chart(
+        data, labels, title, list(data), usd_data, trimmed_data, trimmed_usd_data
+    )
+
+
+def _grouped_chart(operation_data, excluded, title, y_label, values, texts):
+    # one group of bars per passport type, one bar per operation; values and
+    # texts: (operation, passport type) matrices without the excluded operations
+    entries = [entry for entry in operation_data if entry["operation"] not in excluded]
+    return {
+        "type": "grouped",
+        "title": title,
+        "yLabel": y_label,
+        "categories": list(operation_data[0]["data"]),
+        "layers": [
+            {"label": entry["operation"], "values": _rounded(row), "texts": row_texts}
+            for entry, row, row_texts in zip(entries, values, texts.tolist())
+        ],
+    }
+
+
+def passport_types_performance_chart(performance_data, trimmed_performance_data=None):
+    # trimmed means follow the means in parentheses
+    excluded = ["Deployment"]
+    groups = list(performance_data[0]["data"])
+    values = operation_sums(performance_data, groups, excluded)
+    texts = format_durations(values)
+    if trimmed_performance_data is not None:
+        texts = with_trimmed(
+            texts,
+            format_durations(
+                operation_sums(trimmed_performance_data, groups, excluded)
+            ),
+        )
+    return _grouped_chart(
+        performance_data,
+        excluded,
+        "Performances by Passport Types",
+        "Duration (Seconds)",
+        values,
+        texts,
+    )
+
+
+def passport_types_gas_costs_chart(
+    gas_costs_data,
+    costs_usd_data=None,
+    trimmed_gas_costs_data=None,
+    trimmed_costs_usd_data=None,
+):
+    excluded = ["Deployment", "Reading"]
+    groups = list(gas_costs_data[0]["data"])
+
+    def ether_and_usd(operation_data, usd_operation_data):
+        ether = wei_to_eth(operation_sums(operation_data, groups, excluded))
+        if not usd_operation_data:
+            return ether, eth_to_usd(ether)
+        return ether, operation_sums(usd_operation_data, groups, excluded)
+
+    ether, usd = ether_and_usd(gas_costs_data, costs_usd_data)
+    texts = np.char.mod("%.2f", usd)
+    if trimmed_gas_costs_data is not None:
+        _, trimmed_usd = ether_and_usd(trimmed_gas_costs_data, trimmed_costs_usd_data)
+        texts = with_trimmed(texts, np.char.mod("%.2f", trimmed_usd))
+    chart = _grouped_chart(
+        gas_costs_data,
+        excluded,
+        "Gas Costs by Passport Types",
+        "Sepolia ETH (SETH)",
+        ether,
+        texts,
+    )
+    chart["secondaryAxis"] = _usd_axis(ether, usd)
+    return chart
+
+
+def _heatmap_chart(title, annotations, numeric_data, x_labels, y_labels):
+    # cells are coloured by their row-wise normalized value, blank cells are null
+    colors = np.where(np.isnan(numeric_data), np.nan, row_normalize(numeric_data))
+    return {
+        "type": "heatmap",
+        "title": title,
+        "columns": list(x_labels),
+        "rows": list(y_labels),
+        "annotations": [[str(annotation) for annotation in row] for row in annotations],
+        "colors": [_rounded(row, 3) for row in colors],
+    }
+
+
+def performance_summary_chart(duration_totals, trimmed_duration_totals=None):
+    return _heatmap_chart(
+        "Performance Summary",
+        *performance_summary(duration_totals, trimmed_duration_totals),
+    )
+
+
+def costs_summary_chart(costs_usd_totals, trimmed_costs_usd_totals=None):
+    return _heatmap_chart(
+        "Costs Summary", *costs_summary(costs_usd_totals, trimmed_costs_usd_totals)
+    )
+
+
+def theoretical_criteria_summary_chart():
+    return _heatmap_chart(
+        "Theoretical Criteria Summary", *theoretical_criteria_summary()
+    )
+
+
+# plot function of a render job -> function returning its chart for the report;
+# both take the keyword arguments of the job except output_filename
+REPORT_CHARTS = {
+    plot_performance: performance_chart,
+    plot_gas_costs: gas_costs_chart,
+    plot_function_calls_performance: function_calls_performance_chart,
+    plot_function_calls_gas_costs: function_calls_gas_costs_chart,
+    plot_passport_types_operation_performance: passport_types_operation_performance_chart,
+    plot_passport_types_operation_gas_costs: passport_types_operation_gas_costs_chart,
+    plot_passport_types_performance: passport_types_performance_chart,
+    plot_passport_types_gas_costs: passport_types_gas_costs_chart,
+    plot_performance_summary: performance_summary_chart,
+    plot_costs_summary: costs_summary_chart,
+    plot_theoretical_criteria_summary: theoretical_criteria_summary_chart,
+}
+
+
+@profiled
+def job_chart(job):
+    kwargs = {
+        key: value for key, value in job.kwargs.items() if key != "output_filename"
+    }
+    chart = REPORT_CHARTS[job.plot_function](**kwargs)
+    chart["id"] = os.path.splitext(job_output_filename(job))[0]
+    return chart
+
+
+def report_html(charts, title="PermaPass Evaluation"):
+    with open(TEMPLATE_FILE, "r") as f:
+        template = f.read()
+    # "</" would end the script element the charts are embedded in
+    data = json.dumps(charts, separators=(",", ":"), allow_nan=False)
+    return template.replace("{{title}}", title).replace(
+        "{{charts}}", data.replace("</", "<\\/")
+    )
+
+
+@profiled
+def write_report(
+    arweave_data, registry_stores, outliers=None, series=None, output_file=REPORT_FILE
+):
+    # every chart of plan_render_jobs in one self-contained HTML file, drawn by
+    # the browser; returns the ids of the charts
+    charts = [
+        job_chart(job)
+        for job in plan_render_jobs(arweave_data, registry_stores, outliers, series)
+    ]
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    with open(output_file, "w") as f:
+        f.write(report_html(charts))
+    return [chart["id"] for chart in charts]
@@ -0,0 +1,146 @@
+import sqlite3
+import time
+
+from utils.statistics import STATISTICS
+
+RESULTS_DB = "results.sqlite"
+
+# exported table -> metric of its rows, named like in METRICS: durations in
+# seconds, gas costs in wei, costs in USD
+RESULT_TABLES = {
+    "arweave_performance": "duration",
+    "registry_performance": "duration",
+    "registry_gas_costs": "gas_costs",
+    "registry_costs_usd": "costs_usd",
+    "function_performance": "duration",
+    "function_gas_costs": "gas_costs",
+}
+RESULT_METRICS = sorted(set(RESULT_TABLES.values()))
+STATISTIC_TYPES = {"count": "INTEGER"}
+# rows of whole runs have no function name, Arweave rows no chain
+KEY_COLUMNS = ["chain", "registry", "action", "functionName", "metric"]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS campaigns (
+    name TEXT PRIMARY KEY,
+    recorded_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS statistics (
+    campaign TEXT NOT NULL REFERENCES campaigns (name) ON DELETE CASCADE,
+    {", ".join(f"{column} TEXT NOT NULL" for column in KEY_COLUMNS)},
+    {", ".join(f"{statistic} {STATISTIC_TYPES.get(statistic, 'REAL')}" for statistic in STATISTICS)},
+    PRIMARY KEY (campaign, {", ".join(KEY_COLUMNS)})
+);
+-- trends of one registry, action and function across campaigns
+CREATE INDEX IF NOT EXISTS statistics_by_key ON statistics (
+    registry, action, functionName, metric, chain, campaign
+);
+"""
+
+
+def connect(path=RESULTS_DB):
+    connection = sqlite3.connect(path)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def result_rows(tables):
+    # tables: output of compute_tables; one tuple of KEY_COLUMNS and STATISTICS
+    # per row of RESULT_TABLES, trimmed statistics are left out
+    for name, metric in RESULT_TABLES.items():
+        for row in tables.get(name, []):
+            yield (
+                str(row.get("chain", "")),
+                row["registry"],
+                row["action"],
+                row.get("functionName", ""),
+                metric,
+                *(
+                    (
+                        int(row[statistic])
+                        if statistic == "count"
+                        else float(row[statistic])
+                    )
+                    for statistic in STATISTICS
+                ),
+            )
+
+
+def record_campaign(connection, campaign, tables, recorded_at=None):
+    # replaces the statistics of an earlier recording under the same name
+    columns = ["campaign", *KEY_COLUMNS, *STATISTICS]
+    with connection:
+        connection.execute(
+            "INSERT INTO campaigns (name, recorded_at) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET recorded_at = excluded.recorded_at",
+            (campaign, time.time() if recorded_at is None else recorded_at),
+        )
+        connection.execute("DELETE FROM statistics WHERE campaign = ?", (campaign,))
+        connection.executemany(
+            f"INSERT INTO statistics ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            ((campaign, *row) for row in result_rows(tables)),
+        )
+
+
+def campaigns(connection):
+    # oldest first
+    return [
+        dict(row)
+        for row in connection.execute(
+            "SELECT name, recorded_at, "
+            "(SELECT COUNT(*) FROM statistics WHERE campaign = name) AS statistics "
+            "FROM campaigns ORDER BY recorded_at"
+        )
+    ]
+
+
+def trend(connection, registry, action, metric, function_name="", chain=None):
+    # the statistics of one registry, action and function in every campaign,
+    # oldest first
+    query = (
+        "SELECT s.campaign, c.recorded_at, s.chain, "
+        f"{', '.join(f's.{statistic}' for statistic in STATISTICS)} "
+        "FROM statistics s JOIN campaigns c ON c.name = s.campaign "
+        "WHERE s.registry = ? AND s.action = ? AND s.functionName = ? "
+        "AND s.metric = ?"
+    )
+    parameters = [registry, action, function_name, metric]
+    if chain is not None:
+        query += " AND s.chain = ?"
+        parameters.append(str(chain))
+    query += " ORDER BY c.recorded_at, s.chain"
+    return [dict(row) for row in connection.execute(query, parameters)]
+
+
+def _check_campaigns(connection, names):
+    known = [campaign["name"] for campaign in campaigns(connection)]
+    for name in names:
+        if name not in known:
+            raise ValueError(
+                f"Invalid campaign value. Choose one of {', '.join(known) or 'none'}."
+            )
+
+
+def compare_campaigns(connection, baseline, candidate, metric=None):
+    # the statistics both campaigns have, side by side with the change of the
+    # mean; change_pct is None where the baseline mean is 0
+    _check_campaigns(connection, [baseline, candidate])
+    query = (
+        f"SELECT {', '.join(f'a.{column}' for column in KEY_COLUMNS)}, "
+        "a.count AS baseline_count, b.count AS candidate_count, "
+        "a.mean AS baseline_mean, b.mean AS candidate_mean, "
+        "b.mean - a.mean AS change, "
+        "100.0 * (b.mean - a.mean) / NULLIF(a.mean, 0) AS change_pct "
+        "FROM statistics a JOIN statistics b USING "
+        f"({', '.join(KEY_COLUMNS)}) "
+        "WHERE a.campaign = ? AND b.campaign = ?"
+    )
+    parameters = [baseline, candidate]
+    if metric is not None:
+        query += " AND a.metric = ?"
+        parameters.append(metric)
+    query += f" ORDER BY {', '.join(f'a.{column}' for column in KEY_COLUMNS)}"
+    return [dict(row) for row in connection.execute(query, parameters)]
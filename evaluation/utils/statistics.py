@@ -0,0 +1,142 @@
+import numpy as np
+from utils.outliers import outlier_flags
+
+PERCENTILES = {"p50": 50, "p90": 90, "p99": 99}
+CONFIDENCE_INTERVAL = ["ci_low", "ci_high"]
+STATISTICS = ["count", "mean", "std", "min", *PERCENTILES, "max", *CONFIDENCE_INTERVAL]
+
+BOOTSTRAP_SAMPLES = 1000
+CONFIDENCE = 0.95
+# upper bound for the number of resampled values held in memory at once
+BOOTSTRAP_BATCH_SIZE = 10_000_000
+
+
+def _bootstrap_mean_interval(values, n_samples, confidence, seed):
+    rng = np.random.default_rng(seed)
+    means = np.empty(n_samples)
+    batch_size = max(1, BOOTSTRAP_BATCH_SIZE // len(values))
+    for start in range(0, n_samples, batch_size):
+        stop = min(start + batch_size, n_samples)
+        indices = rng.integers(0, len(values), size=(stop - start, len(values)))
+        means[start:stop] = values[indices].mean(axis=1)
+    alpha = (1 - confidence) / 2
+    return np.quantile(means, [alpha, 1 - alpha])
+
+
+def summarize(
+    values,
+    statistics=STATISTICS,
+    n_bootstrap=BOOTSTRAP_SAMPLES,
+    confidence=CONFIDENCE,
+    seed=0,
+):
+    for statistic in statistics:
+        if statistic not in STATISTICS:
+            raise ValueError(
+                f"Invalid statistic value. Choose one of {', '.join(STATISTICS)}."
+            )
+
+    # without values there is nothing to summarize but the count
+    values = np.asarray(values)
+    if len(values) == 0:
+        return {
+            statistic: 0 if statistic == "count" else np.nan for statistic in statistics
+        }
+
+    summary = {
+        "count": len(values),
+        "mean": values.mean(),
+        "std": values.std(ddof=1) if len(values) > 1 else 0.0,
+        "min": values.min(),
+        "max": values.max(),
+    }
+
+    requested_percentiles = [name for name in PERCENTILES if name in statistics]
+    if requested_percentiles:
+        percentiles = np.percentile(
+            values, [PERCENTILES[name] for name in requested_percentiles]
+        )
+        summary.update(zip(requested_percentiles, percentiles))
+
+    if any(statistic in CONFIDENCE_INTERVAL for statistic in statistics):
+        interval = _bootstrap_mean_interval(
+            values.astype(np.float64), n_bootstrap, confidence, seed
+        )
+        summary.update(zip(CONFIDENCE_INTERVAL, interval))
+
+    return {statistic: summary[statistic] for statistic in statistics}
+
+
+def column_statistic(columns, column, statistic="mean", outliers=None):
+    # outliers: None for all values, or the method whose outliers are left out;
+    # actions without runs count as 0, e.g. steps a passport type skips
+    values = columns.get(column, [])
+    if len(values) == 0:
+        return 0
+    if outliers:
+        values = values[~outlier_flags(values, outliers)]
+    return summarize(values, [statistic])[statistic]
+
+
+def _scaled(summary, scale):
+    return {
+        statistic: value / scale if statistic != "count" else value
+        for statistic, value in summary.items()
+    }
+
+
+def compute_statistics(data, column, scale=1, statistics=STATISTICS, outliers=None):
+    # one summary per action, e.g. data is the output of process_registry_data;
+    # with outliers, the number of outliers and the statistics without them
+    # (trimmed_*) are added next to the raw statistics
+    result = {}
+    for key in data.keys():
+        values = data[key].get(column, np.array([]))
+        result[key] = _scaled(summarize(values, statistics), scale)
+        if outliers:
+            flags = outlier_flags(values, outliers)
+            result[key]["outliers"] = int(flags.sum())
+            result[key].update(
+                {
+                    f"trimmed_{statistic}": value
+                    for statistic, value in _scaled(
+                        summarize(values[~flags], statistics), scale
+                    ).items()
+                }
+            )
+    return result
+
+
+def statistics_rows(registries, column, scale=1, statistics=STATISTICS, outliers=None):
+    rows = []
+    for registry, data in registries.items():
+        for action, summary in compute_statistics(
+            data, column, scale, statistics, outliers
+        ).items():
+            rows.append({"registry": registry, "action": action, **summary})
+    return rows
+
+
+def function_statistics_rows(
+    registry_calls, column, scale=1, statistics=STATISTICS, outliers=None
+):
+    # registry_calls: registry name -> "calls" of a load_chain_stores store
+    return [
+        {"registry": registry, "action": action, "functionName": function, **summary}
+        for registry, calls in registry_calls.items()
+        for action, functions in calls.items()
+        for function, summary in compute_statistics(
+            functions, column, scale, statistics, outliers
+        ).items()
+    ]
+
+
+def chain_statistics_rows(
+    chains, column, scale=1, statistics=STATISTICS, outliers=None
+):
+    # chains: chain id -> registry name -> output of process_registry_data
+    return [
+        {"chain": chain_id, **row}
+        for chain_id, registries in chains.items()
+        for row in statistics_rows(registries, column, scale, statistics, outliers)
+    ]
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+
+TIMEZONE = "Europe/Zurich"
+
+ACTIONS = ["deployment", "create", "read", "update", "delete"]
+
+# wei amounts are kept as float64 since they can exceed the int64 range
+MEASUREMENT_COLUMNS = {
+    "gasUsed": np.int64,
+    "effectiveGasPriceInWei": np.float64,
+    "gasCostsInWei": np.float64,
+    "durationInMs": np.int64,
+    "startTimestamp": np.int64,
+    "endTimestamp": np.int64,
+}
+
+
+STEP_COLUMNS = {
+    "run": np.int64,
+    "step": np.int64,
+    "functionName": np.str_,
+    **MEASUREMENT_COLUMNS,
+}
+
+
+def records_to_columns(records):
+    # only columns present in the records are stored, e.g. Arweave measurements
+    # have no gas columns
+    columns = {}
+    if not records:
+        return columns
+    for column, dtype in MEASUREMENT_COLUMNS.items():
+        if column not in records[0]:
+            continue
+        columns[column] = np.fromiter(
+            (record[column] for record in records), dtype=dtype, count=len(records)
+        )
+    return columns
+
+
+def lists_to_columns(lists):
+    return {
+        column: np.asarray(values, dtype=STEP_COLUMNS[column])
+        for column, values in lists.items()
+        if len(values) > 0
+    }
+
+
+def to_local_time(timestamps_in_ms):
+    return (
+        pd.to_datetime(timestamps_in_ms, unit="ms")
+        .tz_localize("UTC")
+        .tz_convert(TIMEZONE)
+        .tz_localize(None)
+        .to_numpy()
+    )
+
+
+def add_local_time(columns):
+    # naive wall-clock start times in TIMEZONE, so plots don't need to convert
+    # the timestamps again
+    if "startTimestamp" in columns:
+        columns["startTimeLocal"] = to_local_time(columns["startTimestamp"])
+    return columns
+
+
+def local_start_times(columns):
+    if "startTimeLocal" in columns:
+        return pd.DatetimeIndex(columns["startTimeLocal"])
+    return pd.DatetimeIndex(to_local_time(columns["startTimestamp"]))
+
+
+def group_by_function(steps):
+    # per-call index: functionName -> the step columns of its calls
+    if not steps:
+        return {}
+
+    function_names, first_steps, groups = np.unique(
+        steps["functionName"], return_index=True, return_inverse=True
+    )
+    order = np.argsort(groups, kind="stable")
+    bounds = np.searchsorted(groups[order], np.arange(len(function_names) + 1))
+    # functions are listed in the order they are first called
+    return {
+        str(function_names[i]): {
+            column: values[order[bounds[i] : bounds[i + 1]]]
+            for column, values in steps.items()
+        }
+        for i in np.argsort(first_steps)
+    }
+
+
+def column_mean(columns, column):
+    if column not in columns or len(columns[column]) == 0:
+        return 0
+    return columns[column].mean()
+
+
+SUMMED_COLUMNS = ["gasUsed", "gasCostsInWei", "durationInMs"]
+
+# which steps of a multi-step action make up the per-run value
+STEP_REDUCTIONS = ["skip_first", "sum", "first", "last"]
+
+
+def _reduced_steps(run_starts, run_ends, n_steps, reduction):
+    if reduction not in STEP_REDUCTIONS:
+        raise ValueError(
+            f"Invalid reduction value. Choose one of {', '.join(STEP_REDUCTIONS)}."
+        )
+
+    if reduction == "sum":
+        return np.ones(n_steps, dtype=bool)
+
+    included = np.zeros(n_steps, dtype=bool)
+    if reduction == "first":
+        included[run_starts] = True
+    elif reduction == "last":
+        included[run_ends - 1] = True
+    else:
+        # single-step runs keep their only step, multi-step runs drop the first
+        included[:] = True
+        included[run_starts[run_ends - run_starts > 1]] = False
+    return included
+
+
+def aggregate_steps(steps, reduction="skip_first"):
+    if not steps:
+        return {}
+
+    run = steps["run"]
+    run_starts = np.flatnonzero(np.r_[True, run[1:] != run[:-1]])
+    run_ends = np.r_[run_starts[1:], len(run)]
+    included = _reduced_steps(run_starts, run_ends, len(run), reduction)
+
+    runs = {"run": run[run_starts]}
+    for column in SUMMED_COLUMNS:
+        values = np.where(included, steps[column], 0)
+        runs[column] = np.add.reduceat(values, run_starts)
+
+    gas_used = runs["gasUsed"]
+    runs["effectiveGasPriceInWei"] = np.divide(
+        runs["gasCostsInWei"],
+        gas_used,
+        out=np.zeros(len(gas_used), dtype=np.float64),
+        where=gas_used > 0,
+    )
+    runs["startTimestamp"] = steps["startTimestamp"][run_starts]
+    runs["endTimestamp"] = steps["endTimestamp"][run_ends - 1]
+    return runs
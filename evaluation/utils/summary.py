@@ -1,102 +1,113 @@
 import numpy as np
-from utils.helpers import DELIMITER, plot_heatmap
+from utils.compositions import OPERATIONS, PASSPORT_TYPES
+from utils.helpers import plot_heatmap
+
+x_labels = list(PASSPORT_TYPES.keys())
+
+# heatmap rows: operation shown in the row and its label, None rows are spacers
+performance_rows = [
+    ("Deployment", "Infrastructure Deployment"),
+    (None, ""),
+    (None, ""),
+    ("Creation", "Passport Creation"),
+    (None, ""),
+    ("Reading", "Passport Reading"),
+    (None, ""),
+    ("Update", "Passport Update"),
+    (None, ""),
+    ("Deletion", "Passport Deletion"),
+]
 
-x_labels = [
-    "QR Code x NFT",
-    "QR Code x DID",
-    "HaLo NFC x PBT",
-    "HaLo NFC x DID",
+costs_rows = [
+    ("Deployment", "Infrastructure Deployment"),
+    (None, ""),
+    (None, ""),
+    ("Creation", "Passport Creation"),
+    (None, ""),
+    ("Update", "Passport Update"),
+    (None, ""),
+    ("Deletion", "Passport Deletion"),
 ]
 
 
-def convert_to_numeric(item):
-    if item == "":
-        return np.nan
-    if item.endswith("s"):
-        return float(item.replace("s", ""))
-    elif item.endswith("USD"):
-        return float(item.replace(" USD", ""))
-    elif len(item.split(DELIMITER)) > 1:
-        return float(item.split(DELIMITER)[0])
-    else:
-        return float(item)
+def summary_matrix(totals, rows, operations=OPERATIONS):
+    # picks the rows of the (operation, passport type) totals, spacers are NaN
+    operation_names = list(operations.keys())
+    row_indices = np.array(
+        [operation_names.index(operation) if operation else -1 for operation, _ in rows]
+    )
+    return np.where((row_indices >= 0)[:, np.newaxis], totals[row_indices], np.nan)
 
 
-def plot_performance_summary():
-    y_labels = [
-        "Infrastructure Deployment",
-        "",  # Spacer
-        "",  # Spacer
-        "Passport Creation",
-        "",  # Spacer
-        "Passport Reading",
-        "",  # Spacer
-        "Passport Update",
-        "",  # Spacer
-        "Passport Deletion",
-    ]
+def format_matrix(matrix, fmt):
+    return np.where(np.isnan(matrix), "", np.char.mod(fmt, matrix))
 
-    data = [
-        ["16.39s", "16.25s", "32.02s", "32.47s"],
-        ["", "", "", ""],  # Spacer
-        ["", "", "", ""],  # Spacer
-        ["14.55s", "14.62s", "30.13s", "29.10s"],
-        ["", "", "", ""],  # Spacer
-        ["0.54s", "0.86s", "0.75s", "1.00s"],
-        ["", "", "", ""],  # Spacer
-        ["14.18s", "13.15s", "13.67s", "13.15s"],
-        ["", "", "", ""],  # Spacer
-        ["13.55s", "17.45s", "13.20s", "17.45s"],
-    ]
 
-    numeric_data = [[convert_to_numeric(item) * -1 for item in row] for row in data]
-    numeric_data = np.array(numeric_data)
+def annotate_matrix(matrix, fmt, trimmed_matrix=None):
+    # the value of every cell and, with trimmed_matrix, its value without
+    # outliers on a second line; cells are coloured by the value
+    annotations = format_matrix(matrix, fmt)
+    if trimmed_matrix is None:
+        return annotations
+    trimmed = np.char.add(
+        np.char.add("\n(trimmed: ", np.char.mod(fmt, trimmed_matrix)), ")"
+    )
+    return np.where(np.isnan(matrix), "", np.char.add(annotations, trimmed))
 
-    plot_heatmap(
-        data,
-        numeric_data,
+
+def performance_summary(duration_totals, trimmed_duration_totals=None):
+    # plot_heatmap arguments: annotations, numeric data, x and y labels
+    matrix = summary_matrix(duration_totals, performance_rows)
+    trimmed_matrix = (
+        summary_matrix(trimmed_duration_totals, performance_rows)
+        if trimmed_duration_totals is not None
+        else None
+    )
+    return (
+        annotate_matrix(matrix, "%.2fs", trimmed_matrix),
+        -matrix,
         x_labels,
-        y_labels,
-        "summary_performance.png",
+        [label for _, label in performance_rows],
     )
 
 
-def plot_costs_summary():
-    y_labels = [
-        "Infrastructure Deployment",
-        "",  # Spacer
-        "",  # Spacer
-        "Passport Creation",
-        "",  # Spacer
-        "Passport Update",
-        "",  # Spacer
-        "Passport Deletion",
-    ]
+def plot_performance_summary(
+    duration_totals,
+    output_filename="summary_performance.png",
+    trimmed_duration_totals=None,
+):
+    plot_heatmap(
+        *performance_summary(duration_totals, trimmed_duration_totals),
+        output_filename,
+    )
 
-    data = [
-        ["11.60 USD", "7.95 USD", "17.97 USD", "12.24 USD"],
-        ["", "", "", ""],  # Spacer
-        ["", "", "", ""],  # Spacer
-        ["1.45 USD", "0.28 USD", "2.60 USD", "1.03 USD"],
-        ["", "", "", ""],  # Spacer
-        ["0.33 USD", "0.28 USD", "0.33 USD", "0.28 USD"],
-        ["", "", "", ""],  # Spacer
-        ["0.35 USD", "0.27 USD", "0.25 USD", "0.27 USD"],
-    ]
 
-    numeric_data = [[convert_to_numeric(item) * -1 for item in row] for row in data]
-    numeric_data = np.array(numeric_data)
+def costs_summary(costs_usd_totals, trimmed_costs_usd_totals=None):
+    matrix = summary_matrix(costs_usd_totals, costs_rows)
+    trimmed_matrix = (
+        summary_matrix(trimmed_costs_usd_totals, costs_rows)
+        if trimmed_costs_usd_totals is not None
+        else None
+    )
+    return (
+        annotate_matrix(matrix, "%.2f USD", trimmed_matrix),
+        -matrix,
+        x_labels,
+        [label for _, label in costs_rows],
+    )
+
 
+def plot_costs_summary(
+    costs_usd_totals,
+    output_filename="summary_costs.png",
+    trimmed_costs_usd_totals=None,
+):
     plot_heatmap(
-        data,
-        numeric_data,
-        x_labels,
-        y_labels,
-        "summary_costs.png",
+        *costs_summary(costs_usd_totals, trimmed_costs_usd_totals), output_filename
     )
 
 
-def plot_theoretical_criteria_summary():
+def theoretical_criteria_summary():
     y_labels = [
         "Scalability",
         "",  # Spacer
@@ -105,42 +116,42 @@ def plot_theoretical_criteria_summary():
         "Security",
     ]
 
+    # (score, annotation), lower scores are more favorable
     data = [
         [
-            f"0{DELIMITER}Hardware\nIndependent",
-            f"0{DELIMITER}Hardware\nIndependent",
-            f"1{DELIMITER}Hardware\nDependent",
-            f"1{DELIMITER}Hardware\nDependent",
+            (0, "Hardware\nIndependent"),
+            (0, "Hardware\nIndependent"),
+            (1, "Hardware\nDependent"),
+            (1, "Hardware\nDependent"),
         ],
-        ["", "", "", ""],  # Spacer
+        None,  # Spacer
         [
-            f"0{DELIMITER}Easier\nMetadata Exchange",
-            f"0{DELIMITER}Easier\nMetadata Exchange",
-            f"1{DELIMITER}Harder\nMetadata Exchange",
-            f"1{DELIMITER}Harder\nMetadata Exchange",
+            (0, "Easier\nMetadata Exchange"),
+            (0, "Easier\nMetadata Exchange"),
+            (1, "Harder\nMetadata Exchange"),
+            (1, "Harder\nMetadata Exchange"),
         ],
-        ["", "", "", ""],  # Spacer
+        None,  # Spacer
         [
-            f"1{DELIMITER}Least\nTamper-Proof",
-            f"1{DELIMITER}Least\nTamper-Proof",
-            f"0{DELIMITER}Most\nTamper-Proof",
-            f"0.5{DELIMITER}Moderately\nTamper-Proof",
+            (1, "Least\nTamper-Proof"),
+            (1, "Least\nTamper-Proof"),
+            (0, "Most\nTamper-Proof"),
+            (0.5, "Moderately\nTamper-Proof"),
         ],
     ]
 
-    numeric_data = [[convert_to_numeric(item) * -1 for item in row] for row in data]
-    numeric_data = np.array(numeric_data)
+    spacer = [(np.nan, "")] * len(x_labels)
+    data = [row if row is not None else spacer for row in data]
 
-    plot_heatmap(
-        data,
-        numeric_data,
+    return (
+        [[annotation for _, annotation in row] for row in data],
+        -np.array([[score for score, _ in row] for row in data], dtype=float),
         x_labels,
         y_labels,
-        "summary_theoretical_criteria.png",
     )
 
 
-def plot_summary():
-    plot_performance_summary()
-    plot_costs_summary()
-    plot_theoretical_criteria_summary()
+def plot_theoretical_criteria_summary(
+    output_filename="summary_theoretical_criteria.png",
+):
+    plot_heatmap(*theoretical_criteria_summary(), output_filename)
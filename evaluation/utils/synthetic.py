@@ -0,0 +1,210 @@
+import json
+import os
+
+import numpy as np
+from utils.compositions import ARWEAVE, REGISTRIES
+from utils.preprocessing import (
+    SEPOLIA_CHAIN_ID,
+    load_chain_stores,
+    load_measurements,
+    select_chain,
+)
+from utils.store import ACTIONS
+
+# synthetic runs follow the 5 minute cadence of the measured campaign
+START_TIMESTAMP = 1718377200000
+RUN_INTERVAL_IN_MS = 5 * 60 * 1000
+# lognormal spread around the measured medians
+DURATION_SIGMA = 0.3
+GAS_PRICE_SIGMA = 0.05
+# runs formatted and written at once
+GENERATE_CHUNK_SIZE = 50_000
+
+STEP_FIELDS = [
+    "gasUsed",
+    "effectiveGasPriceInWei",
+    "gasCostsInWei",
+    "durationInMs",
+    "startTimestamp",
+    "endTimestamp",
+]
+ARWEAVE_FIELDS = ["durationInMs", "startTimestamp", "endTimestamp"]
+
+
+def registry_template(store):
+    # store: one chain of load_chain_stores; the steps of its first run with the
+    # median gasUsed, gas price and duration of every contract function
+    template = []
+    for action in ACTIONS:
+        steps = store["steps"][action]
+        if "run" not in steps:
+            continue
+        calls = store["calls"][action]
+        for function_name in steps["functionName"][steps["run"] == steps["run"][0]]:
+            function_calls = calls[str(function_name)]
+            template.append(
+                {
+                    "action": action,
+                    "functionName": str(function_name),
+                    "gasUsed": int(np.median(function_calls["gasUsed"])),
+                    "effectiveGasPriceInWei": float(
+                        np.median(function_calls["effectiveGasPriceInWei"])
+                    ),
+                    "durationInMs": float(np.median(function_calls["durationInMs"])),
+                }
+            )
+    return template
+
+
+def arweave_template(data):
+    # data: output of load_measurements, median duration per action
+    return {
+        action: float(np.median(columns["durationInMs"]))
+        for action, columns in data.items()
+    }
+
+
+def _record_format(fields, prefix=""):
+    return "{" + prefix + ",".join(f'"{field}":%d' for field in fields) + "}"
+
+
+def _run_format(template):
+    # one %-format string for a whole run, its values are the STEP_FIELDS of
+    # every step in template order
+    actions = []
+    for action in ACTIONS:
+        steps = [
+            _record_format(
+                STEP_FIELDS, f'"functionName":{json.dumps(step["functionName"])},'
+            )
+            for step in template
+            if step["action"] == action
+        ]
+        actions.append(f'"{action}":[{",".join(steps)}]')
+    return "{" + ",".join(actions) + "}"
+
+
+def _durations(medians, shape, rng):
+    return np.maximum(
+        1, np.rint(medians * rng.lognormal(0, DURATION_SIGMA, shape))
+    ).astype(np.int64)
+
+
+def _run_start_timestamps(first_run, n_runs):
+    return START_TIMESTAMP + (first_run + np.arange(n_runs)) * RUN_INTERVAL_IN_MS
+
+
+def registry_runs(template, first_run, n_runs, rng):
+    # (run, step * STEP_FIELDS) matrix of consecutive runs; steps follow each
+    # other with a gap of one millisecond
+    n_steps = len(template)
+    gas_used = np.array([step["gasUsed"] for step in template], dtype=np.int64)
+    gas_prices = np.array([step["effectiveGasPriceInWei"] for step in template])
+    medians = np.array([step["durationInMs"] for step in template])
+
+    durations = _durations(medians, (n_runs, n_steps), rng)
+    prices = np.rint(
+        gas_prices * rng.lognormal(0, GAS_PRICE_SIGMA, (n_runs, n_steps))
+    ).astype(np.int64)
+    starts = (
+        _run_start_timestamps(first_run, n_runs)[:, np.newaxis]
+        + np.cumsum(durations, axis=1)
+        - durations
+        + np.arange(n_steps)
+    )
+
+    values = np.stack(
+        [
+            np.broadcast_to(gas_used, (n_runs, n_steps)),
+            prices,
+            gas_used * prices,
+            durations,
+            starts,
+            starts + durations,
+        ],
+        axis=2,
+    )
+    return values.reshape(n_runs, n_steps * len(STEP_FIELDS))
+
+
+def _write_chunks(f, format_string, n_runs, chunk_values):
+    for first_run in range(0, n_runs, GENERATE_CHUNK_SIZE):
+        values = chunk_values(first_run, min(GENERATE_CHUNK_SIZE, n_runs - first_run))
+        if first_run:
+            f.write(",")
+        f.write(",".join(format_string % tuple(row) for row in values.tolist()))
+
+
+def write_registry_data(
+    file_path,
+    template,
+    n_runs,
+    contract_name,
+    chain_id=SEPOLIA_CHAIN_ID,
+    seed=0,
+):
+    # same schema as data/contracts/*.json, written without indentation
+    rng = np.random.default_rng(seed)
+    with open(file_path, "w") as f:
+        f.write(f"{{{json.dumps(chain_id)}:[")
+        _write_chunks(
+            f,
+            _run_format(template),
+            n_runs,
+            lambda first_run, size: registry_runs(template, first_run, size, rng),
+        )
+        f.write(f'],"contractName":{json.dumps(contract_name)}}}')
+
+
+def arweave_runs(median, first_run, n_runs, rng):
+    durations = _durations(median, n_runs, rng)
+    starts = _run_start_timestamps(first_run, n_runs)
+    return np.stack([durations, starts, starts + durations], axis=1)
+
+
+def write_arweave_data(file_path, template, n_runs, seed=0):
+    # same schema as data/Arweave.json
+    rng = np.random.default_rng(seed)
+    with open(file_path, "w") as f:
+        f.write("{")
+        for i, (action, median) in enumerate(template.items()):
+            if i:
+                f.write(",")
+            f.write(f'"{action}":[')
+            _write_chunks(
+                f,
+                _record_format(ARWEAVE_FIELDS),
+                n_runs,
+                lambda first_run, size: arweave_runs(median, first_run, size, rng),
+            )
+            f.write("]")
+        f.write("}")
+
+
+def generate_dataset(output_path, n_runs, template_path="data", seed=0):
+    # writes <output_path>/Arweave.json and <output_path>/contracts/*.json with
+    # n_runs runs each, modelled on the measurements in template_path
+    os.makedirs(os.path.join(output_path, "contracts"), exist_ok=True)
+
+    write_arweave_data(
+        os.path.join(output_path, f"{ARWEAVE}.json"),
+        arweave_template(
+            load_measurements(os.path.join(template_path, f"{ARWEAVE}.json"))
+        ),
+        n_runs,
+        seed,
+    )
+
+    for i, registry in enumerate(REGISTRIES):
+        stores = load_chain_stores(
+            os.path.join(template_path, "contracts", f"{registry}.json")
+        )
+        write_registry_data(
+            os.path.join(output_path, "contracts", f"{registry}.json"),
+            registry_template(select_chain(stores)),
+            n_runs,
+            registry,
+            seed=seed + i + 1,
+        )
+
+    return output_path
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+# series with more points are downsampled with LTTB before drawing
+MAX_POINTS = 2000
+# markers are only drawn for series with at most this many points
+MAX_MARKERS = 100
+# statistics of resampled and rolling series besides the percentiles pNN
+SERIES_STATISTICS = ["mean", "min", "max", "median"]
+
+
+def _quantile(statistic):
+    if statistic == "median":
+        return 0.5
+    if (
+        statistic.startswith("p")
+        and statistic[1:].isdigit()
+        and int(statistic[1:]) <= 100
+    ):
+        return int(statistic[1:]) / 100
+    raise ValueError(
+        "Invalid statistic value. Choose 'mean', 'min', 'max', 'median' or 'pNN'."
+    )
+
+
+def check_series(interval=None, rolling_window=None, statistic="mean"):
+    # the options of prepare_series, checked before any data is loaded
+    for window in [interval, rolling_window]:
+        if window is None:
+            continue
+        try:
+            valid = pd.Timedelta(window) > pd.Timedelta(0)
+        except ValueError:
+            valid = False
+        if not valid:
+            raise ValueError(
+                f"Invalid interval value {window!r}. Choose a duration like '5min'."
+            )
+    if statistic not in ["mean", "min", "max"]:
+        _quantile(statistic)
+
+
+def _sorted(times, values):
+    times = np.asarray(times, dtype="datetime64[ns]")
+    values = np.asarray(values, dtype=np.float64)
+    order = np.argsort(times, kind="stable")
+    return times[order], values[order]
+
+
+def resample(times, values, interval, statistic="mean"):
+    # one point per interval bin that contains measurements, stamped with the
+    # start of the bin
+    times, values = _sorted(times, values)
+    if len(times) == 0:
+        return times, values
+
+    step = pd.Timedelta(interval).value
+    bins = times.view(np.int64) // step
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+
+    if statistic == "mean":
+        counts = np.diff(np.r_[starts, len(values)])
+        reduced = np.add.reduceat(values, starts) / counts
+    elif statistic == "min":
+        reduced = np.minimum.reduceat(values, starts)
+    elif statistic == "max":
+        reduced = np.maximum.reduceat(values, starts)
+    else:
+        reduced = (
+            pd.Series(values).groupby(bins).quantile(_quantile(statistic)).to_numpy()
+        )
+
+    return (bins[starts] * step).astype("datetime64[ns]"), reduced
+
+
+def rolling(times, values, window, statistic="mean"):
+    # time-based rolling window ending at every measurement
+    times, values = _sorted(times, values)
+    windows = pd.Series(values, index=pd.DatetimeIndex(times)).rolling(window)
+    if statistic in ["mean", "min", "max"]:
+        rolled = getattr(windows, statistic)()
+    else:
+        rolled = windows.quantile(_quantile(statistic))
+    return times, rolled.to_numpy()
+
+
+def lttb(times, values, threshold=MAX_POINTS):
+    # Largest-Triangle-Three-Buckets: keeps the first and last point and, per
+    # bucket, the point spanning the largest triangle with its neighbours
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return times, values
+
+    times = np.asarray(times)
+    values = np.asarray(values, dtype=np.float64)
+    x = times.view(np.int64) if times.dtype.kind == "M" else times
+    x = (x - x[0]).astype(np.float64)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        average_x = x[next_start:next_end].mean()
+        average_y = values[next_start:next_end].mean()
+
+        areas = np.abs(
+            (x[a] - average_x) * (values[start:end] - values[a])
+            - (x[a] - x[start:end]) * (average_y - values[a])
+        )
+        a = start + np.argmax(areas)
+        selected[i + 1] = a
+
+    return times[selected], values[selected]
+
+
+def prepare_series(
+    times,
+    values,
+    interval=None,
+    rolling_window=None,
+    statistic="mean",
+    max_points=MAX_POINTS,
+):
+    if interval:
+        times, values = resample(times, values, interval, statistic)
+    elif rolling_window:
+        times, values = rolling(times, values, rolling_window, statistic)
+    else:
+        times, values = _sorted(times, values)
+    return lttb(times, values, max_points)
@@ -0,0 +1,31 @@
+ETH_CONVERSION = 1e18
+# mainnet price on 2024-06-14 24:00 coingecko
+ETH_TO_USD = 3465.32
+
+
+# ticker of the ether of a test network
+TEST_NETWORK_TICKERS = {"Sepolia": "SETH"}
+
+
+def ether_unit(network="Sepolia"):
+    # plain ETH for other networks and for charts of several networks (None)
+    return TEST_NETWORK_TICKERS.get(network, "ETH")
+
+
+def ether_label(network="Sepolia"):
+    # y-axis label of ETH amounts, e.g. "Sepolia ETH (SETH)"
+    if network in TEST_NETWORK_TICKERS:
+        return f"{network} ETH ({ether_unit(network)})"
+    return ether_unit(network)
+
+
+def eth_to_usd(y):
+    return y * ETH_TO_USD
+
+
+def usd_to_eth(y):
+    return y / ETH_TO_USD
+
+
+def wei_to_eth(y):
+    return y / ETH_CONVERSION
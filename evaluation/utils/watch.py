@@ -0,0 +1,45 @@
+import os
+import time
+
+WATCH_INTERVAL = 1.0
+
+
+def file_signature(file_path):
+    # None for files that do not exist (yet)
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def watch_files(list_files, on_change, interval=WATCH_INTERVAL):
+    # polls the files returned by list_files, which is called on every poll so
+    # files that appear later are watched too, and calls on_change with the
+    # changed paths. A change is only reported once the file looked the same
+    # for two polls in a row, so files that are still being written are not
+    # picked up half-way. on_change returns the paths it could not process,
+    # they are reported again on the next poll.
+    processed = {file_path: file_signature(file_path) for file_path in list_files()}
+    previous = dict(processed)
+
+    while True:
+        time.sleep(interval)
+        current = {file_path: file_signature(file_path) for file_path in list_files()}
+        changed = [
+            file_path
+            for file_path, signature in current.items()
+            if signature != processed.get(file_path)
+            and signature == previous.get(file_path)
+            and signature is not None
+        ]
+        previous = current
+        if changed:
+            failed = on_change(changed) or []
+            processed.update(
+                {
+                    file_path: current[file_path]
+                    for file_path in changed
+                    if file_path not in failed
+                }
+            )